@@ -1,91 +1,222 @@
+import asyncio
 import logging
 import re
+import threading
+import time
 from langgraph.graph import StateGraph, END
+from langchain_core.runnables import RunnableConfig
+from langgraph.types import StreamWriter
 from app.ai.state import AgentState
-from app.ai.supervisor import llm_supervisor_route
+from app.ai.supervisor import route_question
 from app.ai.agents.business_sql_agent import BusinessSQLAgent
 from app.ai.agents.calculation_agent import CalculationAgent
 from app.ai.agents.fallback_agent import FallbackAgent
 from app.ai.tools.pdf_generator import PDFGeneratorTool
 from app.ai.tools.pinecone_schema_retriever import SchemaRetrieverTool
+from app.ai.tools.column_relevance import estimate_tokens
 from app.ai.tools.db_introspector import DBIntrospectionTool
+from app.ai.tools.schema_catalog import SchemaCatalog
+from app.ai.tools.sql_cost_gate import SQLCostGate
+from app.ai.shared_context import SharedSchemaContext
+from app.ai.sql_templates import SQLTemplateStore
 from langchain_openai import ChatOpenAI
-from app.core.config import OPENAI_API_KEY
-from typing import Dict, Any
+from app.core.config import (
+    OPENAI_API_KEY,
+    RESULT_CACHE_ENABLED,
+    RESULT_CACHE_MAX_BYTES,
+    RESULT_CACHE_TTL_SECONDS,
+    RESULT_CACHE_WATERMARK_TTL_SECONDS,
+    SCHEMA_CATALOG_ENABLED,
+    SCHEMA_CONTEXT_MAX_COLUMNS,
+    SCHEMA_CONTEXT_TOKEN_BUDGET,
+    SCHEMA_VERSION_POLL_SECONDS,
+    SPECULATIVE_RETRIEVAL,
+    SQL_COST_GATE_ENABLED,
+    SQL_DEFAULT_DATE_RANGE_DAYS,
+    SQL_MAX_PLAN_COST,
+    SQL_MAX_PLAN_ROWS,
+    SQL_MAX_ROWS,
+    SQL_TEMPLATES_ENABLED,
+    SQL_TEMPLATES_MAX_ENTRIES,
+)
+from app.core import instrumentation
+from app.core.instrumentation import instrumented, timed
+from app.core.result_cache import ResultCache
+from app.core.schema_versions import SchemaVersionProbe
+from typing import Dict, Any, AsyncIterator, Iterable, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
 # Instantiate tools and agents
 llm = ChatOpenAI(api_key=OPENAI_API_KEY, model="gpt-4o-mini", temperature=0)
 pdf_tool = PDFGeneratorTool()
-sql_agent = BusinessSQLAgent(llm, pdf_tool)
+schema_retriever = SchemaRetrieverTool(index_name="schema-index")
+# Loaded at startup (app/main.py); None keeps per-table inspector queries
+schema_catalog = SchemaCatalog() if SCHEMA_CATALOG_ENABLED else None
+db_introspector = DBIntrospectionTool(
+    catalog=schema_catalog, max_columns=SCHEMA_CONTEXT_MAX_COLUMNS, token_budget=SCHEMA_CONTEXT_TOKEN_BUDGET
+)
+sql_templates = SQLTemplateStore(db_introspector, SQL_TEMPLATES_MAX_ENTRIES) if SQL_TEMPLATES_ENABLED else None
+
+cost_gate = (
+    SQLCostGate(SQL_MAX_PLAN_COST, SQL_MAX_PLAN_ROWS, SQL_DEFAULT_DATE_RANGE_DAYS, SQL_MAX_ROWS) if SQL_COST_GATE_ENABLED else None
+)
+
+result_cache = (
+    ResultCache(RESULT_CACHE_MAX_BYTES, RESULT_CACHE_TTL_SECONDS, RESULT_CACHE_WATERMARK_TTL_SECONDS) if RESULT_CACHE_ENABLED else None
+)
+
+sql_agent = BusinessSQLAgent(llm, pdf_tool, template_store=sql_templates, cost_gate=cost_gate, result_cache=result_cache)
+
+# Polled from app/main.py; a schema change invalidates only the tables it touched
+schema_versions = SchemaVersionProbe(SCHEMA_VERSION_POLL_SECONDS) if SCHEMA_VERSION_POLL_SECONDS > 0 else None
+if schema_versions is not None:
+    schema_versions.subscribe(db_introspector.invalidate)
+    if sql_templates is not None:
+        schema_versions.subscribe(sql_templates.invalidate)
+    if result_cache is not None:
+        schema_versions.subscribe(result_cache.invalidate)
 calc_agent = CalculationAgent()
 fallback_agent = FallbackAgent()
 
-schema_retriever = SchemaRetrieverTool(index_name="schema-index")
-db_introspector = DBIntrospectionTool()
+def _failed(result: Any) -> bool:
+    """Agent results report failures as {"error": ...} or as a single [{"error": ...}] row."""
+    if not isinstance(result, dict):
+        return False
+    if result.get("error"):
+        return True
+    rows = result.get("result")
+    return isinstance(rows, list) and bool(rows) and isinstance(rows[0], dict) and "error" in rows[0]
 
 # Node functions must return partial state updates (dict)
+# Nodes also emit progress events through the injected StreamWriter; these only
+# reach a client when the graph is run via astream_agent_graph (no-op otherwise).
+# @instrumented wraps each node in a timing span that is appended to state.timings.
 
-def supervisor_node(state: AgentState) -> Dict[str, Any]:
+@instrumented("supervisor")
+async def supervisor_node(state: AgentState, writer: StreamWriter) -> Dict[str, Any]:
     try:
-        agent_choice, index_terms = llm_supervisor_route(state.question)
+        agent_choice, index_terms = await route_question(state.question)
         next_agent = agent_choice
+        writer({"event": "routed", "agent": next_agent, "index_terms": index_terms})
         debug = (state.debug or "") + f" | Routed to {next_agent}"
         # Extract index terms for Pinecone retrieval
         # logger.debug(f"Supervisor routing -> {next_agent}; index_terms={index_terms}")
         return {"next": next_agent, "debug": debug, "index_terms": index_terms}
     except Exception as e:
         logger.exception("Supervisor error")
-        return {"next": "fallback_agent", "debug": (state.debug or "") + f" | Supervisor error: {e}"}
+        return {"next": "fallback_agent", "debug": (state.debug or "") + f" | Supervisor error: {e}", "degraded": ["supervisor_error"]}
 
-def schema_context_node(state: AgentState) -> Dict[str, Any]:
+def _shared_context(config: Optional[RunnableConfig]) -> Optional[SharedSchemaContext]:
+    return ((config or {}).get("configurable") or {}).get("shared_context")
+
+async def build_schema_context(
+    question: str,
+    index_terms: Optional[List[str]],
+    shared: Optional[SharedSchemaContext] = None,
+) -> Tuple[str, List[Dict[str, Any]]]:
+    """Retrieve business docs and introspect candidate tables; returns (context, introspected tables).
+
+    With a SharedSchemaContext (batch requests) retrieval and introspection results
+    are reused across the questions of the batch.
+    """
+    # Step 1: Retrieve top-k docs (tables, sample queries, ERP notes) from Pinecone
+    # Use filter to prefer docs tagged as table_overview or sample_query
+    metadata_filter = {"chunk_type": {"$in": ["table_overview", "sample_query", "business_note"]}}
+    # logger.debug(f"------------------ metadata_filter: {metadata_filter} ------------------")
+    def retrieve():
+        return schema_retriever.arun(question, top_k=12, metadata_filter=metadata_filter, index_terms=index_terms)
+    with timed("pinecone"):
+        docs = await (shared.retrieve(question, index_terms, retrieve) if shared else retrieve())
+    retrieved_context = SchemaRetrieverTool.build_prompt_context(docs, max_chars=2000)
+    # logger.debug(f"------------------ retrieved_context: {retrieved_context} ------------------")   
+    # Step 2: Extract candidate table names from metadata and sample queries
+    candidate_tables = []
+    seen = set()
+    for d in docs:
+        md = d.get("metadata") or {}
+        t = (md.get("table") or d.get("table") or "").strip()
+        if t and t not in seen:
+            seen.add(t)
+            candidate_tables.append(t)
+    # logger.debug(f"------------------ candidate_tables: {candidate_tables} ------------------")
+    # Step 3: Live DB introspection for authoritative columns/constraints
+    with timed("introspection"):
+        if shared:
+            introspected = await shared.introspect(candidate_tables, db_introspector.aget_table_schemas)
+        else:
+            introspected = await db_introspector.aget_table_schemas(candidate_tables)
+    minimal_schema = db_introspector.build_minimal_context(introspected, question, index_terms) if introspected else ""
+    instrumentation.add(schema_tokens=estimate_tokens(minimal_schema))
+
+    # Step 4: Build compact prompt context for SQLGenerator
+    merged = "\n".join([
+        "-- Retrieved Business Context (Tables, Sample Queries, ERP Notes) --",
+        retrieved_context,
+        "",
+        "-- Live DB Schema (Authoritative) --",
+        minimal_schema
+    ])
+    return merged, introspected
+
+@instrumented("schema_context")
+async def schema_context_node(state: AgentState, writer: StreamWriter, config: RunnableConfig) -> Dict[str, Any]:
     try:
-        # Step 1: Retrieve top-k docs (tables, sample queries, ERP notes) from Pinecone
-        # Use filter to prefer docs tagged as table_overview or sample_query
-        metadata_filter = {"chunk_type": {"$in": ["table_overview", "sample_query", "business_note"]}}
-        # logger.debug(f"------------------ metadata_filter: {metadata_filter} ------------------")
-        docs = schema_retriever.run(state.question, top_k=12, metadata_filter=metadata_filter, index_terms=getattr(state, 'index_terms', None))
-        retrieved_context = SchemaRetrieverTool.build_prompt_context(docs, max_chars=2000)
-        # logger.debug(f"------------------ retrieved_context: {retrieved_context} ------------------")   
-        # Step 2: Extract candidate table names from metadata and sample queries
-        candidate_tables = []
-        seen = set()
-        for d in docs:
-            md = d.get("metadata") or {}
-            t = (md.get("table") or d.get("table") or "").strip()
-            if t and t not in seen:
-                seen.add(t)
-                candidate_tables.append(t)
-        # logger.debug(f"------------------ candidate_tables: {candidate_tables} ------------------")
-        # Step 3: Live DB introspection for authoritative columns/constraints
-        introspected = []
-        for t in candidate_tables:
-            try:
-                introspected.append(db_introspector.get_table_schema(t))
-            except Exception:
-                continue
-        minimal_schema = db_introspector.build_minimal_context(introspected) if introspected else ""
-
-        # Step 4: Build compact prompt context for SQLGenerator
-        merged = "\n".join([
-            "-- Retrieved Business Context (Tables, Sample Queries, ERP Notes) --",
-            retrieved_context,
-            "",
-            "-- Live DB Schema (Authoritative) --",
-            minimal_schema
-        ])
+        merged, introspected = await build_schema_context(state.question, getattr(state, 'index_terms', None), _shared_context(config))
+        writer({"event": "context", "tables": [t["table"] for t in introspected], "chars": len(merged)})
         debug = (state.debug or "") + " | SchemaContext OK"
         return {"context": merged, "debug": debug, "next": "business_sql_agent"}
     except Exception as e:
         logger.exception("SchemaContext error")
-        return {"debug": (state.debug or "") + f" | SchemaContext error: {e}", "next": "business_sql_agent"}
+        return {
+            "debug": (state.debug or "") + f" | SchemaContext error: {e}", "next": "business_sql_agent",
+            "degraded": ["schema_context_error"],
+        }
 
-def business_sql_node(state: AgentState) -> Dict[str, Any]:
+@instrumented("speculative_context")
+async def speculative_supervisor_node(state: AgentState, writer: StreamWriter, config: RunnableConfig) -> Dict[str, Any]:
+    """Route and retrieve schema context concurrently (SPECULATIVE_RETRIEVAL variant).
+
+    Retrieval starts from the raw question because index_terms are not known until
+    routing finishes. The result is kept when the route is business_sql_agent and
+    discarded otherwise, which removes one serial network round trip from the
+    critical path of SQL questions.
+    """
+    retrieval = asyncio.create_task(build_schema_context(state.question, None, _shared_context(config)))
+    try:
+        update = await supervisor_node(state, writer)
+    except BaseException:
+        retrieval.cancel()
+        raise
+    if update.get("next") != "business_sql_agent":
+        retrieval.cancel()
+        return {**update, "debug": update["debug"] + " | Speculative context discarded"}
+    try:
+        merged, introspected = await retrieval
+    except Exception as e:
+        logger.exception("Speculative SchemaContext error")
+        # Let the regular schema_context node retry with the supervisor's index_terms
+        return {**update, "next": "schema_context", "debug": update["debug"] + f" | Speculative context error: {e}"}
+    writer({"event": "context", "tables": [t["table"] for t in introspected], "chars": len(merged)})
+    return {**update, "context": merged, "debug": update["debug"] + " | SchemaContext OK (speculative)"}
+
+@instrumented("business_sql_agent")
+async def business_sql_node(state: AgentState, writer: StreamWriter) -> Dict[str, Any]:
     try:
         logger.debug("BusinessSQLAgent start")
-        result = sql_agent.run(state.question, state.context, state.output_format)
+        # Stays {"tables": None} (not cacheable) unless the query ran and every table it read has a watermark
+        data_watermark: Dict[str, Any] = {"tables": None}
+        result = await sql_agent.arun(
+            state.question, state.context, state.output_format,
+            db_schema=state.db_schema,
+            on_sql=lambda sql: writer({"event": "sql", "sql": sql}),
+            on_rows=lambda rows: writer({"event": "rows", "rows": rows}),
+            on_watermark=lambda tables: data_watermark.update(tables=tables),
+        )
         logger.debug(f"BusinessSQLAgent result: {result}")
+        if isinstance(result, dict) and result.get("time_dependent"):
+            # Kept in state: a calculation result replaces the SQL payload
+            data_watermark["time_dependent"] = True
         # Heuristic: route to calculation agent if question suggests KPI math
         q = (state.question or "").lower()
         # Use word-boundary regex to avoid false positives like 'summary' matching 'sum'
@@ -100,57 +231,71 @@ def business_sql_node(state: AgentState) -> Dict[str, Any]:
         calc_queue = None
         if needs_calc:
             calc_queue = [{"operation_hint": "auto", "source": "sql_result"}]
-        return {"result": result, "debug": (state.debug or "") + " | SQLAgent OK", "next": next_node, "calc_queue": calc_queue}
+        return {
+            "result": result, "debug": (state.debug or "") + " | SQLAgent OK", "next": next_node,
+            "calc_queue": calc_queue, "data_watermark": data_watermark,
+            "degraded": ["sql_error"] if _failed(result) else [],
+        }
     except Exception as e:
         logger.exception("BusinessSQLAgent error")
-        return {"result": {"error": str(e)}, "debug": (state.debug or "") + f" | SQLAgent error: {e}"}
+        return {
+            "result": {"error": str(e)}, "debug": (state.debug or "") + f" | SQLAgent error: {e}",
+            "data_watermark": {"tables": None}, "degraded": ["sql_error"],
+        }
 
-def calculation_node(state: AgentState) -> Dict[str, Any]:
+@instrumented("calculation_agent")
+async def calculation_node(state: AgentState) -> Dict[str, Any]:
     try:
         logger.debug("CalculationAgent start")
         # Process a queue of calculations; for now, iterate until empty
         final_result = state.result
         calc_queue = list(state.calc_queue or [])
         calc_debug = []
+        degraded = []
         while calc_queue:
             task = calc_queue.pop(0)
-            res = calc_agent.run(state.question, state.context, state.output_format, sql_result=final_result)
+            res = await calc_agent.arun(state.question, state.context, state.output_format, sql_result=final_result)
             calc_debug.append(res.get("debug") or "")
+            if _failed(res):
+                degraded = ["calculation_error"]
             # Merge result: prefer calculation output for 'result' when present
             if res and isinstance(res, dict) and ("result" in res or "text" in res):
                 final_result = res
         logger.debug(f"CalculationAgent result: {final_result}")
         debug = (state.debug or "") + " | CalcAgent OK" + (" ".join(calc_debug) if calc_debug else "")
-        return {"result": final_result, "debug": debug}
+        return {"result": final_result, "debug": debug, "degraded": degraded}
     except Exception as e:
         logger.exception("CalculationAgent error")
-        return {"result": {"error": str(e)}, "debug": (state.debug or "") + f" | CalcAgent error: {e}"}
+        return {"result": {"error": str(e)}, "debug": (state.debug or "") + f" | CalcAgent error: {e}", "degraded": ["calculation_error"]}
 
-def fallback_node(state: AgentState) -> Dict[str, Any]:
+@instrumented("fallback_agent")
+async def fallback_node(state: AgentState) -> Dict[str, Any]:
     try:
         logger.debug("FallbackAgent start")
         result = fallback_agent.run(state.question, state.context, state.output_format)
         logger.debug(f"FallbackAgent result: {result}")
-        return {"result": result, "debug": (state.debug or "") + " | FallbackAgent OK"}
+        # Not an answer read from company data (or the supervisor failed): never cached
+        return {"result": result, "debug": (state.debug or "") + " | FallbackAgent OK", "degraded": ["fallback"]}
     except Exception as e:
         logger.exception("FallbackAgent error")
-        return {"result": {"error": str(e)}, "debug": (state.debug or "") + f" | FallbackAgent error: {e}"}
+        return {"result": {"error": str(e)}, "debug": (state.debug or "") + f" | FallbackAgent error: {e}", "degraded": ["fallback"]}
 
 # Build the graph
 
-def build_agent_graph():
+def build_agent_graph(speculative: bool = False):
+    # Feature flags select graph variants; see get_agent_graph for the registry
     graph = StateGraph(AgentState)
-    graph.add_node("supervisor", supervisor_node)
+    graph.add_node("supervisor", speculative_supervisor_node if speculative else supervisor_node)
     graph.add_node("schema_context", schema_context_node)
     graph.add_node("business_sql_agent", business_sql_node)
     graph.add_node("calculation_agent", calculation_node)
     graph.add_node("fallback_agent", fallback_node)
     # Edges
-    graph.add_conditional_edges(
-        "supervisor",
-        lambda s: s.next,
-        {"business_sql_agent": "schema_context", "calculation_agent": "calculation_agent", "fallback_agent": "fallback_agent"}
-    )
+    routes = {"business_sql_agent": "schema_context", "calculation_agent": "calculation_agent", "fallback_agent": "fallback_agent"}
+    if speculative:
+        # Context is already built by the speculative supervisor; schema_context is only a retry path
+        routes.update({"business_sql_agent": "business_sql_agent", "schema_context": "schema_context"})
+    graph.add_conditional_edges("supervisor", lambda s: s.next, routes)
     # Always flow from schema_context to business_sql_agent
     graph.add_edge("schema_context", "business_sql_agent")
     # Conditionally flow from business_sql_agent to calculation_agent or END
@@ -164,32 +309,139 @@ def build_agent_graph():
     graph.set_entry_point("supervisor")
     return graph.compile()
 
+# Compiled graph registry
+# Compiling a StateGraph is pure CPU work that does not depend on the question, so
+# compiled graphs are cached per process and keyed by configuration (output format
+# and feature flags). Unknown output formats share the "json" variant, matching
+# BusinessSQLAgent.run, so arbitrary client input cannot grow the registry.
+
+OUTPUT_FORMATS = ("json", "text", "excel", "pdf")
+
+_graph_registry: Dict[Tuple, Any] = {}
+_graph_registry_lock = threading.Lock()
+
+# Feature flags for the variant served to requests (see build_agent_graph)
+DEFAULT_GRAPH_FLAGS: Dict[str, Any] = {"speculative": SPECULATIVE_RETRIEVAL}
+
+
+def _graph_key(output_format: Optional[str], flags: Dict[str, Any]) -> Tuple:
+    fmt = output_format if output_format in OUTPUT_FORMATS else "json"
+    return (fmt, tuple(sorted(flags.items())))
+
+
+def get_agent_graph(output_format: Optional[str] = "json", **flags):
+    """Return the compiled graph for this configuration, compiling it on first use."""
+    flags = {**DEFAULT_GRAPH_FLAGS, **flags}
+    key = _graph_key(output_format, flags)
+    compiled = _graph_registry.get(key)
+    if compiled is None:
+        with _graph_registry_lock:
+            compiled = _graph_registry.get(key)
+            if compiled is None:
+                compiled = build_agent_graph(**flags)
+                _graph_registry[key] = compiled
+    return compiled
+
+
+def warm_agent_graphs(output_formats: Iterable[str] = OUTPUT_FORMATS, flag_sets: Iterable[Dict[str, Any]] = (DEFAULT_GRAPH_FLAGS,)) -> Dict[str, float]:
+    """Eagerly compile graph variants (called on app startup).
+
+    Returns a report of compile time in milliseconds per variant, plus a "total" entry.
+    """
+    report: Dict[str, float] = {}
+    total_start = time.perf_counter()
+    for flags in flag_sets:
+        for fmt in output_formats:
+            key = _graph_key(fmt, {**DEFAULT_GRAPH_FLAGS, **flags})
+            if key in _graph_registry:
+                continue
+            start = time.perf_counter()
+            get_agent_graph(fmt, **flags)
+            flag_label = ",".join(f"{k}={v}" for k, v in key[1])
+            label = f"{key[0]}[{flag_label}]" if flag_label else key[0]
+            report[label] = round((time.perf_counter() - start) * 1000, 2)
+    report["total"] = round((time.perf_counter() - total_start) * 1000, 2)
+    return report
+
 # Main entry point
 
-def run_agent_graph(question: str, context: str = "", output_format: str = "json", db_schema: str = None):
-    logger.debug(f"AgentGraph invoke → question: {question}, output_format: {output_format}")
-    agent_graph = build_agent_graph()
+def _initial_state(question: str, context: str, output_format: str, db_schema: Optional[str]) -> AgentState:
     # Prepend a search_path hint for the LLM when a specific schema is requested
     context_with_schema = context
     if db_schema:
         context_with_schema = f"-- Use schema: {db_schema}\nSET search_path TO {db_schema};\n" + (context or "")
-    initial_state = AgentState(question=question, context=context_with_schema, output_format=output_format)
-    final_state = agent_graph.invoke(initial_state)
-    # logger.debug(f"Final state: {final_state}")
+    return AgentState(question=question, context=context_with_schema, output_format=output_format, db_schema=db_schema)
 
+
+def _payload(final_state: Any) -> Dict[str, Any]:
     # Extract result and debug from either dict or AgentState
     if isinstance(final_state, dict):
         result = final_state.get("result")
         debug = final_state.get("debug", "")
+        timings = final_state.get("timings") or []
+        data_watermark = final_state.get("data_watermark")
+        degraded = final_state.get("degraded") or []
     else:
         # Assume AgentState
         result = getattr(final_state, "result", None)
         debug = getattr(final_state, "debug", "")
+        timings = getattr(final_state, "timings", None) or []
+        data_watermark = getattr(final_state, "data_watermark", None)
+        degraded = getattr(final_state, "degraded", None) or []
 
+    extra = {"debug": debug, "timings": timings}
+    if data_watermark is not None:
+        extra["data_watermark"] = data_watermark
+    if degraded:
+        extra["degraded"] = sorted(set(degraded))
     if isinstance(result, dict):
-        payload = {**result, "debug": debug}
-    else:
-        payload = {"result": result, "debug": debug}
+        return {**result, **extra}
+    return {"result": result, **extra}
+
 
+async def arun_agent_graph(
+    question: str,
+    context: str = "",
+    output_format: str = "json",
+    db_schema: str = None,
+    shared_context: Optional[SharedSchemaContext] = None,
+):
+    logger.debug(f"AgentGraph invoke → question: {question}, output_format: {output_format}")
+    agent_graph = get_agent_graph(output_format)
+    initial_state = _initial_state(question, context, output_format, db_schema)
+    config = {"configurable": {"shared_context": shared_context}} if shared_context else None
+    final_state = await agent_graph.ainvoke(initial_state, config=config)
+    payload = _payload(final_state)
     logger.debug(f"Response payload: {payload}")
     return payload
+
+
+async def astream_agent_graph(question: str, context: str = "", output_format: str = "json", db_schema: str = None) -> AsyncIterator[Dict[str, Any]]:
+    """Run the graph and yield progress events as nodes emit them.
+
+    Yields the nodes' events ("routed", "context", "sql", "rows" chunks) and finally
+    {"event": "result", "payload": ...}. Rows already streamed are not repeated in the
+    final payload; "row_count" reports how many were sent.
+    """
+    logger.debug(f"AgentGraph stream → question: {question}, output_format: {output_format}")
+    agent_graph = get_agent_graph(output_format)
+    initial_state = _initial_state(question, context, output_format, db_schema)
+    final_state: Any = None
+    streamed_rows = 0
+    async for mode, chunk in agent_graph.astream(initial_state, stream_mode=["custom", "values"]):
+        if mode == "values":
+            final_state = chunk
+            continue
+        if chunk.get("event") == "rows":
+            streamed_rows += len(chunk.get("rows") or [])
+        yield chunk
+    payload = _payload(final_state)
+    if streamed_rows and isinstance(payload.get("result"), list):
+        payload.pop("result")
+        payload["row_count"] = streamed_rows
+    yield {"event": "result", "payload": payload}
+
+
+def run_agent_graph(question: str, context: str = "", output_format: str = "json", db_schema: str = None):
+    """Blocking wrapper around arun_agent_graph for scripts and other non-async callers."""
+    return asyncio.run(arun_agent_graph(question, context, output_format, db_schema=db_schema))
@@ -1,32 +1,145 @@
 from langchain_openai import ChatOpenAI
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
 from app.ai.tools.pdf_generator import PDFGeneratorTool
 from app.ai.tools.excel_exporter import ExcelExporterTool
+from app.ai.sql_templates import SQLTemplateStore
+from app.ai.tools.sql_cost_gate import SQLCostGate, bounded_sql
 from sqlalchemy import text
-from app.core.database import engine
+from sqlalchemy.exc import DBAPIError
+from app.core.database import replica_router
+from app.core import fast_json, freshness, instrumentation, metrics, result_cursor, sql_analysis
+from app.core.result_cache import ResultCache
+from app.core.config import RESULT_CURSORS_ENABLED, SLOW_QUERY_MS, SQL_MAX_RESULT_BYTES, SQL_MAX_ROWS
 import re
+import time
 import logging
 
+# Rows fetched per server-side cursor round trip (and per streamed chunk)
+FETCH_CHUNK_ROWS = 200
+
+logger = logging.getLogger(__name__)
+
+RowsCallback = Callable[[List[Dict[str, Any]]], None]
+WatermarkCallback = Callable[[Optional[Dict[str, List[Any]]]], None]
+
+
+class SQLResult(NamedTuple):
+    rows: List[Dict[str, Any]]
+    truncated: bool = False
+    # Cost-gate plan summary (see SQLCostGate.check); None when the gate is off or the query never planned
+    plan: Optional[Dict[str, Any]] = None
+    # Normalized-query fingerprint (see app/core/sql_analysis.py); same for queries differing only in literals
+    fingerprint: Optional[str] = None
+    # Keyset position after the last row when the result was truncated (see app/core/result_cursor.py)
+    cursor: Optional[Dict[str, Any]] = None
+    # Rows depend on the day they were read: the query calls current_date/now() or the cost gate added a date range
+    time_dependent: bool = False
+
+
 class BusinessSQLAgent:
-    def __init__(self, llm: ChatOpenAI, pdf_tool: PDFGeneratorTool):
+    def __init__(
+        self,
+        llm: ChatOpenAI,
+        pdf_tool: PDFGeneratorTool,
+        template_store: Optional[SQLTemplateStore] = None,
+        cost_gate: Optional[SQLCostGate] = None,
+        result_cache: Optional[ResultCache] = None,
+    ):
         self.llm = llm
         self.pdf_tool = pdf_tool
         self.excel_tool = ExcelExporterTool()
+        self.template_store = template_store
+        self.cost_gate = cost_gate
+        self.result_cache = result_cache
+
+    async def arun(
+        self,
+        question: str,
+        context: str = "",
+        output_format: str = "json",
+        db_schema: Optional[str] = None,
+        on_sql: Optional[Callable[[str], None]] = None,
+        on_rows: Optional[RowsCallback] = None,
+        on_watermark: Optional[WatermarkCallback] = None,
+        **kwargs,
+    ) -> Dict[str, Any]:
+        """Generate and execute SQL, then shape the rows for output_format.
+
+        on_sql is called with the generated SQL and on_rows with each chunk of rows as
+        it is fetched, so callers can stream progress before the full result exists.
+        on_watermark receives the data watermark of the tables read (see aexecute_sql).
 
-    def run(self, question: str, context: str = "", output_format: str = "json", **kwargs) -> Dict[str, Any]:
-        sql = self.generate_sql(question, context)
-        rows = self.execute_sql(sql)
+        When the template store has SQL for this question's shape, it runs with the
+        question's literals as binds instead of generating SQL; generated SQL that runs
+        without error is learned as a template.
+        """
+        template = None
+        if self.template_store is not None:
+            with instrumentation.timed("sql_template"):
+                template = await self.template_store.match(question, db_schema)
+            metrics.record_cache("sql_template", template is not None)
+        if template:
+            sql, params = template
+            instrumentation.add(sql_template=1)
+            if on_sql:
+                on_sql(sql)
+            result = await self.aexecute_sql(sql, params=params, on_rows=on_rows, on_watermark=on_watermark)
+            if result.rows and "error" in result.rows[0]:
+                # Stored SQL no longer fits (e.g. values of a different type); fall back to generation
+                self.template_store.forget(question, db_schema)
+                template = None
+        if not template:
+            sql, params = await self.agenerate_sql(question, context), None
+            if on_sql:
+                on_sql(sql)
+            result = await self.aexecute_sql(sql, on_rows=on_rows, on_watermark=on_watermark)
+            if self.template_store is not None and not (result.rows and "error" in result.rows[0]):
+                with instrumentation.timed("sql_template_learn"):
+                    await self.template_store.learn(question, db_schema, sql)
+        rows = result.rows
+        sql_info = self._sql_info(sql, params, result)
         if output_format == "pdf":
             pdf = self.pdf_tool.run(str(rows))
-            return {"format": "pdf", "pdf": pdf, "sql": sql}
+            return {"format": "pdf", "pdf": pdf, **sql_info}
         if output_format == "excel":
             excel = self.excel_tool.run(rows)
-            return {"format": "excel", "excel": {"filename": excel.get("filename"), "size": excel.get("size")}, "sql": sql}
+            return {"format": "excel", "excel": {"filename": excel.get("filename"), "size": excel.get("size")}, **sql_info}
         if output_format == "text":
-            return {"format": "text", "text": str(rows), "sql": sql}
-        return {"format": "json", "result": rows, "sql": sql}
+            return {"format": "text", "text": str(rows), **sql_info}
+        return {"format": "json", "result": rows, **sql_info}
+
+    @staticmethod
+    def _sql_info(sql: str, params: Optional[Dict[str, Any]], result: SQLResult) -> Dict[str, Any]:
+        sql_info: Dict[str, Any] = {"sql": sql, "sql_fingerprint": result.fingerprint, "truncated": result.truncated}
+        if params:
+            sql_info["sql_params"] = params
+        if result.plan:
+            sql_info["plan"] = result.plan
+        if result.cursor:
+            # Pass to GET /results/{continuation} for the next page
+            sql_info["continuation"] = result_cursor.encode_cursor(result.cursor)
+        if result.time_dependent:
+            # Cached answers are only served on the UTC day they were computed
+            sql_info["time_dependent"] = True
+        return sql_info
 
-    def generate_sql(self, question: str, context: str) -> str:
+    async def afetch_page(self, token: str, on_rows: Optional[RowsCallback] = None) -> Dict[str, Any]:
+        """Next page of a truncated result: its SQL re-runs from the token's keyset position, without the LLM."""
+        try:
+            page = result_cursor.decode_cursor(token)
+        except ValueError as e:
+            return {"error": str(e)}
+        watermark: Dict[str, Any] = {}
+        result = await self.aexecute_sql(
+            page["sql"], params=page["params"] or None, on_rows=on_rows,
+            on_watermark=lambda value: watermark.update(tables=value), page=page,
+        )
+        payload = {"format": "json", "result": result.rows, **self._sql_info(page["sql"], page["params"], result)}
+        if watermark:
+            payload["data_watermark"] = watermark
+        return payload
+
+    async def agenerate_sql(self, question: str, context: str) -> str:
         prompt = f"""
         You are a PostgreSQL SQL generator. Follow these rules strictly:
         - Use ONLY tables and columns present under the section "-- Live DB Schema (Authoritative) --" in the provided schema.
@@ -44,20 +157,44 @@ class BusinessSQLAgent:
         Return only the final SQL.
         """
         try:
-            sql = self.llm.invoke(prompt).content.strip()
+            start = time.perf_counter()
+            message = await self.llm.ainvoke(prompt)
+            instrumentation.record_llm_usage("BusinessSQLAgent.generate_sql", message, (time.perf_counter() - start) * 1000)
+            sql = message.content.strip()
             return sql
         except Exception as e:
             return f"-- Error generating SQL: {e}"
 
-    def execute_sql(self, sql: str) -> List[Dict[str, Any]]:
-        """Execute a generated SQL query safely (read-only) and return rows.
+    async def aexecute_sql(
+        self,
+        sql: str,
+        params: Optional[Dict[str, Any]] = None,
+        on_rows: Optional[RowsCallback] = None,
+        on_watermark: Optional[WatermarkCallback] = None,
+        page: Optional[Dict[str, Any]] = None,
+    ) -> SQLResult:
+        """Execute a generated SQL query safely (read-only) and return SQLResult(rows, truncated, plan, ...).
 
         Protections:
         - Strips code fences and prose, extracts the SELECT statement only
-        - Rejects multiple statements
-        - Enforces read-only transaction in Postgres
-        - Applies a statement timeout
-        - Truncates result set to a safe maximum row count
+        - Parses the statement (app/core/sql_analysis.py) and rejects anything but a single
+          read-only SELECT/WITH query; identifiers and string literals are never mistaken for keywords
+        - Runs on a read replica when one is healthy (replica_router), else the primary analytics_engine:
+          read-only transactions and a statement timeout set at connect time
+        - Binds params (from a SQL template) as query parameters, never as SQL text
+        - Plans the query first (cost_gate): over-budget queries get a default date range
+          or are rejected without running, with the plan summary and reason in the result
+        - Wraps the query in an outer LIMIT so Postgres never produces more than SQL_MAX_ROWS + 1 rows
+        - Fetches through a server-side cursor, passing each chunk to on_rows, and stops at
+          SQL_MAX_ROWS rows or SQL_MAX_RESULT_BYTES of JSON, whichever comes first (truncated=True)
+        - When the query could exceed SQL_MAX_ROWS, reads it in a unique keyset order so a truncated
+          result carries a cursor for the next page; page (a decoded cursor) reads the page after it
+        - Reads the ingest watermark of the queried tables in the same snapshot and passes it to on_watermark
+        - Cancelling the calling task (client disconnect) makes psycopg send a cancel request for the
+          running statement, so the backend stops and the connection returns to the pool at once
+
+        With a result_cache, a query whose canonical SQL and binds ran before is answered from
+        the cache while the ingest watermark of every table it read is unchanged.
         """
         logger = logging.getLogger(__name__)
 
@@ -75,49 +212,157 @@ class BusinessSQLAgent:
 
         sql_clean = clean_sql(sql)
 
-        # Basic denylist for dangerous keywords (best-effort)
-        lowered = sql_clean.lower()
-        forbidden = ["insert ", "update ", "delete ", "drop ", "alter ", "truncate ", "create ", "grant ", "revoke ", "vacuum ", "analyze "]
-        if any(tok in lowered for tok in forbidden):
-            return [{"error": "Only read-only SELECT queries are allowed", "sql": sql_clean}]
+        analysis = sql_analysis.analyze(sql_clean)
+        if analysis.error:
+            return SQLResult([{"error": analysis.error, "sql": sql_clean}])
+        instrumentation.add(sql_fingerprint=analysis.fingerprint)
 
-        # Disallow multiple statements via semicolons in the middle
-        if ";" in sql_clean:
-            return [{"error": "Multiple SQL statements are not allowed", "sql": sql_clean}]
+        cache_key = None
+        if self.result_cache is not None and not analysis.volatile:
+            cache_key = self.result_cache.key(analysis.canonical, params, page)
+            try:
+                with instrumentation.timed("result_cache"):
+                    cached = await self.result_cache.get(cache_key)
+            except Exception:
+                logger.exception("Result cache lookup failed")
+                cached = None
+            metrics.record_cache("sql_result", cached is not None)
+            if cached is not None:
+                rows = cached["rows"]
+                instrumentation.add(sql_result_cache=1, rows=len(rows), truncated=int(cached["truncated"]))
+                if on_rows:
+                    for i in range(0, len(rows), FETCH_CHUNK_ROWS):
+                        on_rows(rows[i:i + FETCH_CHUNK_ROWS])
+                if on_watermark:
+                    on_watermark(cached["watermark"])
+                return SQLResult(
+                    rows, cached["truncated"], cached["plan"], analysis.fingerprint, cached["cursor"],
+                    analysis.time_dependent or bool((cached["plan"] or {}).get("rewrites")),
+                )
 
-        # Require SELECT/CTE
-        if not (lowered.startswith("select") or lowered.startswith("with")):
-            return [{"error": "Query must start with SELECT or WITH", "sql": sql_clean}]
+        watermark: Dict[str, Any] = {}
 
-        max_rows = 1000
-        try:
-            with engine.connect() as conn:
-                trans = conn.begin()
-                try:
-                    # Read-only transaction and timeout (milliseconds)
-                    conn.execute(text("SET TRANSACTION READ ONLY"))
-                    conn.execute(text("SET LOCAL statement_timeout = 10000"))
-                    # If the LLM included a SET search_path hint at top of SQL, allow it; otherwise ignore.
-                    if sql_clean.lower().startswith("set search_path to"):
-                        # Extract the SET line and run it separately then strip from sql_clean
-                        first_newline = sql_clean.find("\n")
-                        set_stmt = sql_clean[:first_newline] if first_newline != -1 else sql_clean
-                        try:
-                            conn.execute(text(set_stmt))
-                        except Exception:
-                            pass
-                        sql_clean = sql_clean[first_newline+1:] if first_newline != -1 else sql_clean
-                    result = conn.execute(text(sql_clean))
-                    rows = [dict(r._mapping) for r in result]
-                    # Truncate overly large result sets for safety
-                    if len(rows) > max_rows:
-                        rows = rows[:max_rows]
-                    # Rollback read-only transaction explicitly
-                    trans.rollback()
-                except Exception:
-                    trans.rollback()
-                    raise
-            return rows
-        except Exception as e:
-            logger.exception("SQL execution error")
-            return [{"error": f"SQL execution failed: {e}", "sql": sql_clean}]
+        def capture_watermark(value: Optional[Dict[str, List[Any]]]) -> None:
+            watermark["value"] = value
+            if on_watermark:
+                on_watermark(value)
+
+        streamed = False
+
+        def forward_rows(rows: List[Dict[str, Any]]) -> None:
+            nonlocal streamed
+            streamed = True
+            on_rows(rows)
+
+        for attempt in (1, 2):
+            try:
+                result = await self._execute_bounded(
+                    sql_clean, params, forward_rows if on_rows else None,
+                    capture_watermark if cache_key else on_watermark, analysis, page,
+                )
+                result = result._replace(time_dependent=analysis.time_dependent or bool((result.plan or {}).get("rewrites")))
+                if cache_key and not (result.rows and "error" in result.rows[0]):
+                    self.result_cache.put(
+                        cache_key, result.rows, result.truncated, result.plan, result.cursor,
+                        watermark.get("value"), analysis.time_dependent,
+                    )
+                return result
+            except DBAPIError as e:
+                # Pooled connections are not pre-pinged; a connection the server dropped fails
+                # on first use, so retry once on a fresh one. Not once rows reached on_rows: the
+                # caller has already sent them and a retry would emit them twice
+                if e.connection_invalidated and attempt == 1 and not streamed:
+                    logger.warning("Analytics connection was dropped; retrying on a fresh connection")
+                    continue
+                logger.exception("SQL execution error")
+                return SQLResult([{"error": f"SQL execution failed: {e}", "sql": sql_clean}])
+            except Exception as e:
+                logger.exception("SQL execution error")
+                return SQLResult([{"error": f"SQL execution failed: {e}", "sql": sql_clean}])
+
+    async def _execute_bounded(
+        self,
+        sql_clean: str,
+        params: Optional[Dict[str, Any]],
+        on_rows: Optional[RowsCallback],
+        on_watermark: Optional[WatermarkCallback],
+        analysis: sql_analysis.SQLAnalysis,
+        page: Optional[Dict[str, Any]] = None,
+    ) -> SQLResult:
+        # Analytics connections (replica or primary) are read-only, REPEATABLE READ and carry
+        # the statement timeout from connect time, so the transaction needs no SET round trips
+        async with replica_router.connect() as conn:
+            trans = await conn.begin()
+            try:
+                # If the LLM included a SET search_path hint at top of SQL, allow it; otherwise ignore.
+                if sql_clean.lower().startswith("set search_path to"):
+                    # Extract the SET line and run it separately then strip from sql_clean
+                    first_newline = sql_clean.find("\n")
+                    set_stmt = sql_clean[:first_newline] if first_newline != -1 else sql_clean
+                    try:
+                        await conn.execute(text(set_stmt))
+                    except Exception:
+                        pass
+                    sql_clean = sql_clean[first_newline+1:] if first_newline != -1 else sql_clean
+                plan = None
+                if self.cost_gate is not None:
+                    with instrumentation.timed("explain"):
+                        sql_clean, plan = await self.cost_gate.check(conn, sql_clean, params)
+                    if plan.get("rejected"):
+                        await trans.rollback()
+                        instrumentation.add(sql_rejected=1)
+                        return SQLResult(
+                            [{"error": f"Query rejected before execution: {plan['rejected']}", "sql": sql_clean, "plan": plan}],
+                            False, plan, analysis.fingerprint,
+                        )
+                keys = page["keys"] if page else None
+                if keys is None and RESULT_CURSORS_ENABLED:
+                    with instrumentation.timed("keyset"):
+                        keys = await result_cursor.plan_keyset(conn, sql_clean, SQL_MAX_ROWS)
+                where, seek_params = result_cursor.seek(keys, page["after"]) if page else (None, {})
+                order_by = result_cursor.order_by(keys) if keys else None
+                start = time.perf_counter()
+                result = await conn.stream(
+                    text(bounded_sql(sql_clean, SQL_MAX_ROWS, where, order_by)), {**(params or {}), **seek_params}
+                )
+                rows = []
+                result_bytes = 0
+                truncated = False
+                async for partition in result.partitions(FETCH_CHUNK_ROWS):
+                    chunk = []
+                    for r in partition:
+                        row = dict(r._mapping)
+                        # Encoded size as the response encoder writes it
+                        size = len(fast_json.dumps(row))
+                        if len(rows) + len(chunk) >= SQL_MAX_ROWS or result_bytes + size > SQL_MAX_RESULT_BYTES:
+                            truncated = True
+                            break
+                        chunk.append(row)
+                        result_bytes += size
+                    rows.extend(chunk)
+                    if on_rows and chunk:
+                        on_rows(chunk)
+                    if truncated:
+                        break
+                await result.close()
+                elapsed = time.perf_counter() - start
+                instrumentation.add(sql_ms=elapsed * 1000, rows=len(rows), result_bytes=result_bytes, truncated=int(truncated))
+                metrics.SQL_SECONDS.observe(elapsed)
+                metrics.SQL_ROWS.observe(len(rows))
+                if elapsed * 1000 >= SLOW_QUERY_MS:
+                    logger.warning(
+                        f"Slow query {analysis.fingerprint} ({elapsed * 1000:.0f} ms, {len(rows)} rows, "
+                        f"tables={analysis.tables}): {analysis.normalized}"
+                    )
+                if on_watermark:
+                    with instrumentation.timed("watermark"):
+                        on_watermark(await freshness.probe_watermark(conn, sql_clean))
+                # Rollback read-only transaction explicitly
+                await trans.rollback()
+            except Exception:
+                await trans.rollback()
+                raise
+        cursor = None
+        if truncated and keys and rows:
+            cursor = {"sql": sql_clean, "params": params or {}, "keys": keys, "after": result_cursor.cursor_after(keys, rows[-1])}
+        return SQLResult(rows, truncated, plan, analysis.fingerprint, cursor)
@@ -1,7 +1,9 @@
 from typing import Any, Dict, Optional
 import re
+import time
 from langchain_openai import ChatOpenAI
 from app.core.config import OPENAI_API_KEY
+from app.core.instrumentation import record_llm_usage
 
 class CalculationAgent:
     def __init__(self):
@@ -22,7 +24,7 @@ class CalculationAgent:
             "conversion_rate": self._conversion_rate,
         }
 
-    def run(self, question: str, context: str = "", output_format: str = "json", sql_result: Optional[Any] = None, **kwargs) -> Dict[str, Any]:
+    async def arun(self, question: str, context: str = "", output_format: str = "json", sql_result: Optional[Any] = None, **kwargs) -> Dict[str, Any]:
         """
         Use LLM to extract calculation intent and numbers, then run the appropriate calculation tool.
         Supports ERP metrics: sum, average, min, max, count, growth_rate, percent_change, inventory_turnover, gross_margin, net_profit, cogs, roi, conversion_rate.
@@ -33,7 +35,10 @@ class CalculationAgent:
             User question: {question}
             SQL result: {sql_result}
             """
-            llm_response = self.llm.invoke(prompt).content.strip()
+            start = time.perf_counter()
+            message = await self.llm.ainvoke(prompt)
+            record_llm_usage("CalculationAgent", message, (time.perf_counter() - start) * 1000)
+            llm_response = message.content.strip()
             import json
             try:
                 parsed = json.loads(llm_response)
@@ -0,0 +1,191 @@
+"""Local fast-path router that answers the supervisor's question without an LLM call.
+
+The vocabulary is built once at import from two sources already in the repo:
+- the domain catalog in SUPERVISOR_ROUTING_PROMPT (domains, table names/patterns, metrics)
+- table names and column names of the SQLAlchemy models in app/models
+
+classify() tokenizes the question, scores it against that vocabulary and returns
+(agent, index_terms, confidence). app/ai/supervisor.py only calls the LLM when the
+confidence is below FAST_ROUTER_MIN_CONFIDENCE. Classification is dictionary
+lookups over a handful of tokens (well under a millisecond).
+"""
+import math
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.ai.prompts.supervisor_routing_prompt import SUPERVISOR_ROUTING_PROMPT
+from app.models import Base
+from app.core import metrics
+
+# Tokens too generic to signal anything on their own
+STOP_TOKENS = {
+    "a", "an", "and", "are", "at", "by", "for", "from", "in", "is", "it", "me", "my", "of", "on", "or",
+    "our", "the", "to", "was", "what", "which", "with", "amzn", "amz", "n2", "id", "data", "v2", "txt",
+    "all", "metrics", "created", "job", "chunk", "extra", "previous", "row", "ids", "name", "type",
+}
+# Words that signal the question wants rows/aggregates read from company data
+DATA_INTENT = {
+    "top", "total", "totals", "sum", "list", "show", "count", "many", "much", "average", "avg", "trend",
+    "report", "breakdown", "compare", "per", "each", "daily", "weekly", "monthly", "last", "this",
+    "yesterday", "today", "week", "month", "quarter", "year", "ytd", "mtd", "highest", "lowest", "best", "worst",
+}
+TIME_WINDOW = re.compile(
+    r"\b(last|this|past|previous)\s+(\d+\s+)?(day|week|month|quarter|year)s?\b|\b(yesterday|today|ytd|mtd|q[1-4]|20\d\d)\b"
+)
+MATH_WORDS = {
+    "growth", "percent", "percentage", "ratio", "margin", "roi", "plus", "minus", "times", "divided",
+    "multiply", "average", "sum", "difference", "change", "rate", "of",
+}
+NUMBER = re.compile(r"[-+]?\d+(?:\.\d+)?%?")
+WORD = re.compile(r"[a-z0-9]+")
+# Spellings in questions that map onto catalog vocabulary
+ALIASES = {"p&l": "pnl", "p & l": "pnl", "profit and loss": "pnl", "sponsored brands": "sb", "sponsored display": "sd"}
+
+
+def _split(name: str) -> List[str]:
+    return [t for t in WORD.findall(name.lower().replace("_", " ")) if t not in STOP_TOKENS and not t.isdigit()]
+
+
+def _parse_domain_catalog(prompt: str) -> List[Tuple[str, List[str], Set[str]]]:
+    """Return (domain, table patterns, keywords) for each '- domain: ...' catalog line."""
+    section = prompt.split("Domain catalog", 1)[-1].split("Instructions:", 1)[0]
+    domains = []
+    for line in section.splitlines():
+        m = re.match(r"\s*-\s*([a-z_.]+):\s*(.+)", line)
+        if not m:
+            continue
+        domain, rest = m.group(1), m.group(2)
+        patterns = [p for p in re.findall(r"[a-z0-9_]+\*?", rest) if "_" in p]
+        keywords = set(_split(rest.replace("*", " ").replace("/", " "))) | set(_split(domain))
+        domains.append((domain, patterns, keywords))
+    return domains
+
+
+class FastRouter:
+    def __init__(self, prompt: str = SUPERVISOR_ROUTING_PROMPT, metadata=Base.metadata):
+        self.domains = _parse_domain_catalog(prompt)
+        self.domain_keywords: Dict[str, Set[str]] = defaultdict(set)
+        for domain, _, keywords in self.domains:
+            for kw in keywords:
+                self.domain_keywords[kw].add(domain)
+        self.table_domain: Dict[str, Optional[str]] = {}
+        self.name_tokens: Dict[str, Set[str]] = defaultdict(set)
+        self.column_tokens: Dict[str, Set[str]] = defaultdict(set)
+        for table in metadata.sorted_tables:
+            self.table_domain[table.name] = self._domain_for(table.name)
+            for tok in _split(table.name):
+                self.name_tokens[tok].add(table.name)
+            for col in table.columns:
+                for tok in _split(col.name):
+                    self.column_tokens[tok].add(table.name)
+        n = max(1, len(self.table_domain))
+        self.idf = {
+            tok: math.log(1 + n / len(tables))
+            for tok, tables in list(self.name_tokens.items()) + list(self.column_tokens.items())
+        }
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+        self.llm_route_ms: Optional[float] = None
+
+    def _domain_for(self, table: str) -> Optional[str]:
+        for domain, patterns, _ in self.domains:
+            for p in patterns:
+                if (p.endswith("*") and table.startswith(p[:-1])) or table == p:
+                    return domain
+        return None
+
+    def _tokens(self, question: str) -> List[str]:
+        for phrase, alias in ALIASES.items():
+            question = question.replace(phrase, f" {alias} ")
+        out = []
+        for tok in WORD.findall(question):
+            # campaigns -> campaign, when only the singular is known
+            if tok.endswith("s") and len(tok) > 3 and tok not in self.idf and tok[:-1] in self.idf:
+                tok = tok[:-1]
+            out.append(tok)
+        return out
+
+    def classify(self, question: str) -> Tuple[Optional[str], List[str], float]:
+        """Return (agent, index_terms, confidence); agent is None when nothing matched."""
+        q = (question or "").lower()
+        tokens = self._tokens(q)
+        domain_hits = [t for t in tokens if t in self.domain_keywords or t in self.name_tokens]
+        column_hits = [
+            t for t in tokens
+            if t in self.column_tokens and t not in domain_hits and t not in DATA_INTENT and t not in MATH_WORDS
+        ]
+        intent = any(t in DATA_INTENT for t in tokens) or bool(TIME_WINDOW.search(q))
+
+        if not domain_hits:
+            # Arithmetic on numbers given in the question, with no company data mentioned
+            if len(NUMBER.findall(q)) >= 2 and any(t in MATH_WORDS for t in tokens) and not column_hits:
+                return "calculation_agent", [], 0.9
+            if not column_hits:
+                return None, [], 0.0
+
+        distinct_domain_hits = set(domain_hits)
+        confidence = (
+            0.4 * bool(distinct_domain_hits)
+            + 0.2 * (len(distinct_domain_hits) >= 2)
+            + 0.2 * intent
+            + 0.2 * bool(column_hits)
+        )
+        return "business_sql_agent", self._index_terms(q, tokens), round(confidence, 2)
+
+    def _index_terms(self, q: str, tokens: List[str]) -> List[str]:
+        staging = "stage" in tokens or "staging" in tokens
+        tokens = [t for t in tokens if t not in DATA_INTENT and t not in STOP_TOKENS]
+        scores: Dict[str, float] = defaultdict(float)
+        for tok in set(tokens):
+            for table in self.name_tokens.get(tok, ()):
+                scores[table] += 2 * self.idf[tok]
+            for table in self.column_tokens.get(tok, ()):
+                scores[table] += self.idf[tok]
+            for domain in self.domain_keywords.get(tok, ()):
+                for table, table_domain in self.table_domain.items():
+                    if table_domain == domain:
+                        scores[table] += 1.0
+        if not staging:
+            scores = {t: s for t, s in scores.items() if not t.startswith("stage_")}
+        tables = sorted(scores, key=lambda t: (-scores[t], t))[:3]
+        terms: List[str] = []
+        for term in (
+            tables
+            + [self.table_domain[t] for t in tables if self.table_domain.get(t)]
+            + [t for t in tokens if t in self.domain_keywords or t in self.name_tokens or t in self.column_tokens]
+            + [m.group(0) for m in TIME_WINDOW.finditer(q)]
+        ):
+            if term and term not in terms:
+                terms.append(term)
+        return terms[:15]
+
+    def record(self, hit: bool, route_ms: float) -> None:
+        """Track hit rate and latency saved (hits are credited the running average LLM route time)."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+                saved_ms = max(0.0, (self.llm_route_ms or 0.0) - route_ms)
+                self.saved_ms += saved_ms
+                metrics.FAST_ROUTER_SAVED_SECONDS.inc(saved_ms / 1000)
+            else:
+                self.misses += 1
+                prev = self.llm_route_ms
+                self.llm_route_ms = route_ms if prev is None else 0.9 * prev + 0.1 * route_ms
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "avg_llm_route_ms": round(self.llm_route_ms or 0.0, 2),
+                "saved_ms": round(self.saved_ms, 2),
+            }
+
+
+fast_router = FastRouter()
@@ -0,0 +1,54 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+
+class SharedSchemaContext:
+    """Retrieval and introspection results shared by the questions of one /ask/batch call.
+
+    Passed to the graph as config["configurable"]["shared_context"]. Entries are
+    asyncio tasks, so questions that need the same retrieval or table while it is
+    still in flight await the same call instead of issuing their own. Awaits are
+    shielded so one question being cancelled does not cancel the shared call.
+    - Pinecone retrieval is keyed by the question's index_terms (as a set), or by the
+      question text when there are none.
+    - Introspection is keyed per table, so questions with overlapping index_terms that
+      land on the same candidate tables introspect each table once per batch.
+    """
+
+    def __init__(self):
+        self._retrievals: Dict[Tuple[str, FrozenSet[str]], asyncio.Task] = {}
+        self._tables: Dict[str, asyncio.Task] = {}
+
+    async def retrieve(
+        self,
+        question: str,
+        index_terms: Optional[List[str]],
+        fetch: Callable[[], Awaitable[List[Dict[str, Any]]]],
+    ) -> List[Dict[str, Any]]:
+        terms = frozenset(t.lower() for t in index_terms or [])
+        key = ("", terms) if terms else (question.strip().lower(), terms)
+        if key not in self._retrievals:
+            self._retrievals[key] = asyncio.ensure_future(fetch())
+        return await asyncio.shield(self._retrievals[key])
+
+    async def introspect(
+        self,
+        tables: List[str],
+        fetch: Callable[[List[str]], Awaitable[List[Dict[str, Any]]]],
+    ) -> List[Dict[str, Any]]:
+        missing = [t for t in tables if t not in self._tables]
+        if missing:
+            # One call (one pooled connection) for every table this batch has not seen yet
+            task = asyncio.ensure_future(fetch(missing))
+            for t in missing:
+                self._tables[t] = task
+        found: Dict[str, Dict[str, Any]] = {}
+        for task in {id(self._tables[t]): self._tables[t] for t in tables}.values():
+            for schema in await asyncio.shield(task):
+                found[schema["table"]] = schema
+        return [found[t] for t in tables if t in found]
+
+    def cancel(self) -> None:
+        """Cancel calls still in flight, once no question of the batch is waiting for them."""
+        for task in [*self._retrievals.values(), *self._tables.values()]:
+            task.cancel()
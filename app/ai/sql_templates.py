@@ -0,0 +1,165 @@
+"""Question-shape → parameterized SQL templates, so repeat question shapes skip SQL generation.
+
+After a generated query runs without error, the literals found in the question
+(dates, ASINs, SKU-like codes, quoted names, numbers) are located in the SQL and
+replaced with bind parameters. The template is stored under the question's shape
+(the question with those literals replaced by typed slots) and db_schema. A later
+question with the same shape runs the stored SQL with its own literals as binds.
+
+A template is only learned when every question literal appears exactly once as a
+SQL literal; otherwise the new values could not be substituted safely. Each
+template records a signature of the introspected schema of the tables it reads
+and is dropped when that schema changes, or when app/core/schema_versions.py
+reports a change to one of them.
+"""
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.ai.tools.db_introspector import DBIntrospectionTool
+from app.core import freshness
+
+# Question literals, in match priority; each match is masked before the next pattern runs
+LITERAL_PATTERNS = [
+    ("quoted", re.compile(r"'([^']+)'|\"([^\"]+)\"")),
+    ("date", re.compile(r"\b(\d{4}-\d{2}-\d{2})\b")),
+    ("asin", re.compile(r"\b(B0[A-Z0-9]{8})\b", re.IGNORECASE)),
+    # Codes mixing letters and digits with - or _ (SKUs, campaign ids)
+    ("sku", re.compile(r"\b((?=[\w-]*\d)(?=[\w-]*[A-Za-z])[A-Za-z0-9]+(?:[-_][A-Za-z0-9]+)+)\b")),
+    ("number", re.compile(r"(?<![\w.])(\d+(?:\.\d+)?)(?![\w.])")),
+]
+# SQL string literals first so numbers inside strings are not matched as numeric literals
+SQL_LITERAL = re.compile(r"'((?:[^']|'')*)'|(?<![\w.:$])(\d+(?:\.\d+)?)(?![\w.])")
+
+
+@dataclass
+class SQLTemplate:
+    sql: str
+    tables: List[str]
+    schema_signature: str
+
+
+def extract_literals(question: str) -> Tuple[str, List[Tuple[str, str]]]:
+    """Return (shape, [(kind, value), ...]) with literals in question order."""
+    found: List[Tuple[int, int, str, str]] = []
+    masked = question or ""
+    for kind, pattern in LITERAL_PATTERNS:
+        for m in pattern.finditer(masked):
+            value = next(g for g in m.groups() if g is not None)
+            found.append((m.start(), m.end(), kind, value))
+        # Keep offsets stable for the next pattern
+        masked = pattern.sub(lambda m: " " * len(m.group(0)), masked)
+    found.sort()
+    shape, last = [], 0
+    for start, end, kind, _ in found:
+        shape.append(question[last:start])
+        shape.append("{" + kind + "}")
+        last = end
+    shape.append(question[last:])
+    normalized = " ".join("".join(shape).lower().split()).rstrip("?. ")
+    literals = [(kind, value.upper() if kind == "asin" else value) for _, _, kind, value in found]
+    return normalized, literals
+
+
+def parameterize(sql: str, literals: List[Tuple[str, str]]) -> Optional[str]:
+    """Replace each question literal in sql with :p<i>; None when any is missing or ambiguous."""
+    tokens = [(m.start(), m.end(), m.group(1), m.group(2)) for m in SQL_LITERAL.finditer(sql)]
+    replacements: List[Tuple[int, int, int]] = []
+    for i, (kind, value) in enumerate(literals):
+        if kind == "number":
+            matches = [t for t in tokens if t[3] is not None and t[3] == value]
+        else:
+            matches = [t for t in tokens if t[2] is not None and t[2].replace("''", "'").upper() == value.upper()]
+        if len(matches) != 1 or any(r[0] == matches[0][0] for r in replacements):
+            return None
+        replacements.append((matches[0][0], matches[0][1], i))
+    out = sql
+    for start, end, i in sorted(replacements, reverse=True):
+        out = out[:start] + f":p{i}" + out[end:]
+    return out
+
+
+def _bind_value(kind: str, value: str) -> Any:
+    if kind == "number":
+        return float(value) if "." in value else int(value)
+    return value
+
+
+class SQLTemplateStore:
+    def __init__(self, introspector: DBIntrospectionTool, max_entries: int = 500):
+        self.introspector = introspector
+        self.max_entries = max_entries
+        self._templates: "OrderedDict[Tuple[str, str], SQLTemplate]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def _schema_signature(self, tables: List[str], db_schema: Optional[str]) -> Tuple[List[str], str]:
+        # Relations that do not introspect (CTE names, EXTRACT(... FROM col)) are skipped
+        by_schema: Dict[Optional[str], List[str]] = {}
+        for name in tables:
+            schema, _, table = name.replace('"', "").rpartition(".")
+            by_schema.setdefault(schema or db_schema, []).append(table)
+        schemas = []
+        for schema, names in by_schema.items():
+            for s in await self.introspector.aget_table_schemas(names, schema=schema):
+                schemas.append({**s, "table": f"{schema}.{s['table']}" if schema else s["table"]})
+        found = sorted(s["table"] for s in schemas)
+        blob = json.dumps(sorted(schemas, key=lambda s: s["table"]), sort_keys=True, default=str)
+        return found, hashlib.sha256(blob.encode()).hexdigest()
+
+    async def match(self, question: str, db_schema: Optional[str]) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Return (sql, binds) for a stored template of this question's shape with an unchanged schema."""
+        shape, literals = extract_literals(question)
+        key = (shape, db_schema or "")
+        with self._lock:
+            template = self._templates.get(key)
+            if template is not None:
+                self._templates.move_to_end(key)
+        if template is None:
+            return None
+        _, signature = await self._schema_signature(template.tables, db_schema)
+        if signature != template.schema_signature:
+            self.forget(question, db_schema)
+            return None
+        binds = {f"p{i}": _bind_value(kind, value) for i, (kind, value) in enumerate(literals)}
+        return template.sql, binds
+
+    async def learn(self, question: str, db_schema: Optional[str], sql: str) -> bool:
+        """Store sql (which ran without error) as the template for this question's shape."""
+        shape, literals = extract_literals(question)
+        templated = parameterize(sql, literals)
+        if templated is None:
+            return False
+        tables, signature = await self._schema_signature(freshness.referenced_relations(sql), db_schema)
+        if not tables:
+            return False
+        with self._lock:
+            self._templates[(shape, db_schema or "")] = SQLTemplate(templated, tables, signature)
+            self._templates.move_to_end((shape, db_schema or ""))
+            while len(self._templates) > self.max_entries:
+                self._templates.popitem(last=False)
+        return True
+
+    def invalidate(self, relations: Set[str]) -> int:
+        """Drop templates reading any of these tables (quote_ident-qualified, as schema_versions reports them)."""
+        names = set()
+        for relation in relations:
+            qualified = relation.replace('"', "")
+            # Templates store names as introspected: bare, or schema-qualified when db_schema was given
+            names.update((qualified, qualified.rpartition(".")[2]))
+        with self._lock:
+            stale = [k for k, t in self._templates.items() if any(n.replace('"', "") in names for n in t.tables)]
+            for key in stale:
+                del self._templates[key]
+        return len(stale)
+
+    def forget(self, question: str, db_schema: Optional[str]) -> None:
+        shape, _ = extract_literals(question)
+        with self._lock:
+            self._templates.pop((shape, db_schema or ""), None)
+
+    def __len__(self) -> int:
+        return len(self._templates)
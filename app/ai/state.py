@@ -1,10 +1,12 @@
-from pydantic import BaseModel
-from typing import Any, Optional, List, Dict
+import operator
+from pydantic import BaseModel, Field
+from typing import Annotated, Any, Optional, List, Dict
 
 class AgentState(BaseModel):
     question: str
     context: Optional[str] = ""
     output_format: Optional[str] = "json"
+    db_schema: Optional[str] = None
     result: Optional[Any] = None
     next: Optional[str] = None
     debug: Optional[str] = ""
@@ -12,3 +14,11 @@ class AgentState(BaseModel):
     index_terms: Optional[List[str]] = None
     # Iterative calculation support
     calc_queue: Optional[List[Dict[str, Any]]] = None
+    # Set by business_sql_agent: {"tables": {table: [max job_execution_id, max job_chunk_fetched_at]}},
+    # or {"tables": None} when the SQL read a table without ingest watermark columns
+    data_watermark: Optional[Dict[str, Any]] = None
+    # Why the answer is not a clean SQL/calculation result ("supervisor_error", "fallback", ...); each node
+    # appends its own, and answers with any reason are not cached (see app/core/answer_cache.py)
+    degraded: Annotated[List[str], operator.add] = Field(default_factory=list)
+    # Structured per-node spans (see app/core/instrumentation.py); each node appends its own
+    timings: Annotated[List[Dict[str, Any]], operator.add] = Field(default_factory=list)
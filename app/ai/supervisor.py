@@ -1,13 +1,44 @@
 from langchain_openai import ChatOpenAI
-from app.core.config import OPENAI_API_KEY
+from app.core.config import OPENAI_API_KEY, FAST_ROUTER_ENABLED, FAST_ROUTER_MIN_CONFIDENCE
 from app.ai.prompts.supervisor_routing_prompt import SUPERVISOR_ROUTING_PROMPT
+from app.ai.fast_router import fast_router
+from app.core import instrumentation, metrics
 import json
+import time
 
-def llm_supervisor_route(question: str):
+# Built once per process; constructing the client per call costs more than the routing itself
+llm = ChatOpenAI(api_key=OPENAI_API_KEY, model="gpt-4o-mini", temperature=0)
+
+async def route_question(question: str):
+    """Returns tuple: (agent_name, index_terms: List[str]).
+
+    Tries the local fast-path router first and falls back to the LLM supervisor when
+    its confidence is below FAST_ROUTER_MIN_CONFIDENCE.
+    """
+    start = time.perf_counter()
+    if FAST_ROUTER_ENABLED:
+        agent, index_terms, confidence = fast_router.classify(question)
+        if agent and confidence >= FAST_ROUTER_MIN_CONFIDENCE:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            fast_router.record(True, elapsed_ms)
+            metrics.record_cache("fast_router", True)
+            instrumentation.add(route_source="fast_path", route_confidence=confidence, route_ms=elapsed_ms)
+            return agent, index_terms
+    result = await llm_supervisor_route(question)
+    if FAST_ROUTER_ENABLED:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        fast_router.record(False, elapsed_ms)
+        metrics.record_cache("fast_router", False)
+        instrumentation.add(route_source="llm", route_ms=elapsed_ms)
+    return result
+
+async def llm_supervisor_route(question: str):
     """Returns tuple: (agent_name, index_terms: List[str])"""
-    llm = ChatOpenAI(api_key=OPENAI_API_KEY, model="gpt-4o-mini", temperature=0)
     prompt = SUPERVISOR_ROUTING_PROMPT.format(question=question)
-    raw = llm.invoke(prompt).content.strip()
+    start = time.perf_counter()
+    message = await llm.ainvoke(prompt)
+    instrumentation.record_llm_usage("supervisor", message, (time.perf_counter() - start) * 1000)
+    raw = message.content.strip()
     try:
         data = json.loads(raw)
         agent = str(data.get("agent", "fallback_agent")).strip()
@@ -0,0 +1,210 @@
+"""Question-aware column selection for the live schema section of the SQL prompt.
+
+Wide tables (amzn_ads_sb_campaigns, sc_catalog, amzn_fba_inventory_planning_data)
+have 60-100 columns, most of them irrelevant to any one question. select_columns()
+scores every column of the candidate tables against the question and the
+supervisor's index_terms and keeps, per table, the primary and foreign key columns
+plus the best-scoring others: at most max_columns per table and, across all tables,
+only as many as fit token_budget (estimated at ~4 characters per token). Either
+limit works alone. The next-best columns are named without types (at most
+max_columns more per table, counted against the same budget), so a column scored
+just too low stays usable; the prompt gives the number of the rest.
+
+A column scores on:
+- its name: the whole name in the question, or its words (campaign_name: campaign,
+  name) among the question's words, exactly or by a shared prefix
+- SYNONYMS: business words that name other columns (spend -> cost, ACOS -> cost and sales)
+- the index_terms, and the model's column group (see app/ai/tools/model_catalog.py)
+- being a date/timestamp (more so when the question has a time window: a period
+  word or a month name)
+Key columns are always kept, so *_id columns get no boost of their own and do not
+push out the measures a question asks for.
+Ingest bookkeeping columns (job_*, previous_row_ids, extra, created_at) only appear
+when the question names them.
+"""
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+WORD = re.compile(r"[a-z0-9]+")
+
+# Question words -> column words they refer to
+SYNONYMS = {
+    "spend": ["cost"],
+    "spent": ["cost"],
+    "acos": ["cost", "sales"],
+    "tacos": ["cost", "sales"],
+    "roas": ["sales", "cost"],
+    "cpc": ["cost", "clicks"],
+    "cpm": ["cost", "impressions"],
+    "ctr": ["clicks", "impressions", "through", "rate"],
+    "cvr": ["purchases", "clicks", "conversion"],
+    "conversion": ["purchases", "orders", "units"],
+    "conversions": ["purchases", "orders", "units"],
+    "revenue": ["sales", "amount", "price", "total"],
+    "earnings": ["sales", "amount", "total"],
+    "sold": ["units", "sold", "quantity", "purchased"],
+    "sell": ["units", "sold", "quantity", "purchased"],
+    "sells": ["units", "sold", "quantity", "purchased"],
+    "selling": ["units", "sold", "quantity", "purchased"],
+    "units": ["units", "quantity", "purchased", "ordered"],
+    "unit": ["units", "quantity", "purchased", "ordered"],
+    "qty": ["quantity"],
+    "orders": ["purchases", "order"],
+    "profit": ["profit", "margin", "amount", "cost", "fees"],
+    "margin": ["profit", "cost", "price"],
+    "fee": ["fee", "fees", "charge", "amount"],
+    "fees": ["fee", "fees", "charge", "amount"],
+    "stock": ["quantity", "inventory", "available", "fulfillable", "inbound"],
+    "inventory": ["quantity", "inventory", "available", "fulfillable", "inbound"],
+    "ntb": ["new", "brand"],
+    "refund": ["refund", "amount", "reimbursement"],
+    "refunds": ["refund", "amount", "reimbursement"],
+    "product": ["asin", "sku", "product", "title"],
+    "products": ["asin", "sku", "product", "title"],
+    "item": ["asin", "sku", "item"],
+    "items": ["asin", "sku", "item"],
+}
+# Words that ask for a time window or time grouping
+TIME_WORDS = {
+    "date", "day", "days", "daily", "week", "weeks", "weekly", "month", "months", "monthly", "quarter",
+    "year", "years", "yearly", "ytd", "mtd", "today", "yesterday", "last", "since", "between", "trend",
+    "january", "february", "march", "april", "may", "june", "july", "august", "september", "october",
+    "november", "december", "jan", "feb", "mar", "apr", "jun", "jul", "aug", "sep", "sept", "oct", "nov", "dec",
+}
+STOP_WORDS = {
+    "a", "an", "and", "are", "at", "by", "for", "from", "how", "in", "is", "it", "me", "my", "of", "on", "or",
+    "our", "per", "show", "the", "to", "top", "was", "what", "which", "with", "all", "each", "list", "many", "much",
+}
+# Written by the ingest jobs; useful for freshness, not for answering questions
+TECHNICAL_COLUMNS = {"created_at", "job_execution_id", "job_chunk_name", "job_chunk_fetched_at", "previous_row_ids", "extra"}
+DATE_TYPES = ("date", "timestamp")
+CHARS_PER_TOKEN = 4
+# Part of token_budget left to the names of columns shown without types
+NAMES_BUDGET_SHARE = 0.25
+
+
+def _stem(word: str) -> str:
+    # campaigns/campaign, clicks/click; leaves short words and -ss (class) alone
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def _words(text: str) -> List[str]:
+    return [_stem(w) for w in WORD.findall((text or "").lower().replace("_", " ")) if w not in STOP_WORDS]
+
+
+class QuestionTerms:
+    """The question's words, prepared once for scoring every column of every candidate table."""
+
+    def __init__(self, question: str, index_terms: Optional[Iterable[str]] = None):
+        self.text = " ".join(WORD.findall((question or "").lower()))
+        raw = WORD.findall((question or "").lower())
+        self.words: Set[str] = set(_words(question))
+        self.synonyms: Set[str] = {_stem(w) for word in raw for w in SYNONYMS.get(word, [])}
+        self.index_terms: Set[str] = {w for term in index_terms or [] for w in _words(term)}
+        self.time_window = any(word in TIME_WORDS for word in raw)
+
+
+def score_column(column: Dict[str, Any], terms: QuestionTerms) -> float:
+    name = column["name"]
+    words = _words(name) or [name.lower()]
+    if name.lower().replace("_", " ") in terms.text and len(words) > 1:
+        # Multi-word column named verbatim ("campaign name")
+        return 10.0
+    score = 0.0
+    for word in words:
+        if word in terms.words:
+            score += 3.0
+        elif word in terms.synonyms:
+            score += 2.0
+        elif len(word) >= 4 and any(len(w) >= 4 and (w.startswith(word[:4]) and word.startswith(w[:4])) for w in terms.words):
+            # purchased/purchases, fulfillment/fulfillable
+            score += 1.0
+        if word in terms.index_terms:
+            score += 1.0
+    # Normalized by length, so "cost" outranks "cost_type" for "spend"
+    score /= len(words)
+    group = column.get("group")
+    if group and terms.words & set(_words(group)):
+        score += 0.5
+    column_type = str(column.get("type", "")).lower()
+    if name.lower() in TECHNICAL_COLUMNS:
+        return score - 3.0 if score <= 1.0 else score
+    if column_type.startswith(DATE_TYPES):
+        score += 2.0 if terms.time_window else 1.0
+    return score
+
+
+def _required(table: Dict[str, Any]) -> Set[str]:
+    keys = set(table.get("primary_key") or [])
+    for fk in table.get("foreign_keys") or []:
+        keys.update(fk.get("constrained_columns") or [])
+    return keys
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _column_tokens(column: Dict[str, Any]) -> int:
+    return estimate_tokens(f"{column['name']} {column['type']}, ")
+
+
+def select_columns(
+    tables: List[Dict[str, Any]],
+    question: str,
+    index_terms: Optional[Iterable[str]] = None,
+    max_columns: int = 20,
+    token_budget: int = 0,
+) -> List[Tuple[List[Dict[str, Any]], List[str]]]:
+    """(columns shown with types, names of columns shown without) for each table, in table order.
+
+    Columns come in declaration order, names best-scoring first. max_columns <= 0
+    means no per-table limit and token_budget <= 0 no budget; with neither, every
+    column is shown with its type. Key columns are always kept, even past the budget.
+    """
+    if max_columns <= 0 and token_budget <= 0:
+        return [(list(t.get("columns") or []), []) for t in tables]
+    terms = QuestionTerms(question, index_terms)
+    keep: List[Set[str]] = []
+    candidates: List[Tuple[float, int, int, Dict[str, Any]]] = []
+    used = 0
+    for t_index, table in enumerate(tables):
+        required = _required(table)
+        keep.append(set())
+        # Header, PK and FK lines
+        used += estimate_tokens(f"Table {table.get('table')}: \nPK: {', '.join(required)}\n") + 8
+        for c_index, column in enumerate(table.get("columns") or []):
+            if column["name"] in required:
+                keep[t_index].add(column["name"])
+                used += _column_tokens(column)
+            else:
+                # Ties: earlier tables (better retrieval rank), then declaration order
+                candidates.append((-score_column(column, terms), t_index, c_index, column))
+    ranked = sorted(candidates, key=lambda c: c[:3])
+    typed_budget = int(token_budget * (1 - NAMES_BUDGET_SHARE))
+    extra = [0] * len(tables)
+    rest = []
+    for candidate in ranked:
+        _, t_index, _, column = candidate
+        cost = _column_tokens(column)
+        if (max_columns > 0 and extra[t_index] >= max_columns) or (token_budget > 0 and used + cost > typed_budget):
+            rest.append(candidate)
+            continue
+        keep[t_index].add(column["name"])
+        extra[t_index] += 1
+        used += cost
+    names: List[List[str]] = [[] for _ in tables]
+    for negative_score, t_index, _, column in rest:
+        cost = estimate_tokens(f"{column['name']}, ")
+        if negative_score > 0 or (max_columns > 0 and len(names[t_index]) >= max_columns):
+            # Ingest bookkeeping columns the question does not name stay out
+            continue
+        if token_budget > 0 and used + cost > token_budget:
+            continue
+        names[t_index].append(column["name"])
+        used += cost
+    return [
+        ([c for c in table.get("columns") or [] if c["name"] in keep[i]], names[i]) for i, table in enumerate(tables)
+    ]
@@ -1,19 +1,85 @@
-from typing import Dict, List
+import logging
+from typing import Dict, List, Optional, Set
 from sqlalchemy import inspect
-from app.core.database import engine
+from app.ai.tools.column_relevance import select_columns
+from app.ai.tools.schema_catalog import SchemaCatalog
+from app.core.database import engine, replica_router
+
+logger = logging.getLogger(__name__)
 
 
 class DBIntrospectionTool:
     name = "db_introspector"
     description = "Inspect live database to fetch exact columns, types, and constraints for candidate tables."
 
-    def __init__(self):
-        self.inspector = inspect(engine)
+    def __init__(self, catalog: Optional[SchemaCatalog] = None, max_columns: int = 0, token_budget: int = 0):
+        self._inspector = None
+        # When set, schemas are served from this in-memory catalog instead of per-table inspector queries
+        self.catalog = catalog
+        # Question-aware column pruning in build_minimal_context (see column_relevance.py); 0 keeps every column
+        self.max_columns = max_columns
+        self.token_budget = token_budget
+
+    @property
+    def inspector(self):
+        # Created lazily so importing the tool does not open a database connection
+        if self._inspector is None:
+            self._inspector = inspect(engine)
+        return self._inspector
+
+    async def invalidate(self, relations: Set[str]) -> None:
+        """Forget cached schemas of these tables (quote_ident-qualified) after a schema change."""
+        # The inspector caches every reflection it made; rebuild it on next use
+        self._inspector = None
+        if self.catalog is not None:
+            await self.catalog.refresh(relations)
 
     def get_table_schema(self, table_name: str, schema: str = None) -> Dict:
-        cols = self.inspector.get_columns(table_name, schema=schema)
-        pks = self.inspector.get_pk_constraint(table_name, schema=schema)
-        fks = self.inspector.get_foreign_keys(table_name, schema=schema)
+        if self.catalog is not None and self.catalog.loaded:
+            found = self.catalog.tables([table_name], schema)
+            if found:
+                return found[0]
+        return self._describe(self.inspector, table_name, schema)
+
+    async def aget_table_schemas(self, table_names: List[str], schema: str = None) -> List[Dict]:
+        """Introspect several tables over a single pooled async connection.
+
+        Tables that cannot be introspected (missing, no permission) are skipped. Runs on a
+        read replica when one is healthy (see replica_router in app/core/database.py).
+        With a catalog, tables are looked up in memory; only names it lacks are introspected.
+        """
+        def describe_all(sync_conn, names: List[str]) -> List[Dict]:
+            insp = inspect(sync_conn)
+            out = []
+            for t in names:
+                try:
+                    out.append(self._describe(insp, t, schema))
+                except Exception:
+                    continue
+            return out
+
+        if not table_names:
+            return []
+        found: Dict[str, Dict] = {}
+        if self.catalog is not None:
+            try:
+                await self.catalog.ensure_loaded()
+                found = {entry["table"]: entry for entry in self.catalog.tables(table_names, schema)}
+            except Exception:
+                logger.exception("Schema catalog unavailable; introspecting tables directly")
+        missing = [t for t in table_names if t not in found]
+        if missing:
+            # Tables created since the catalog was loaded (or no catalog at all)
+            async with replica_router.connect() as conn:
+                for entry in await conn.run_sync(describe_all, missing):
+                    found[entry["table"]] = entry
+        return [found[t] for t in table_names if t in found]
+
+    @staticmethod
+    def _describe(insp, table_name: str, schema: str = None) -> Dict:
+        cols = insp.get_columns(table_name, schema=schema)
+        pks = insp.get_pk_constraint(table_name, schema=schema)
+        fks = insp.get_foreign_keys(table_name, schema=schema)
         return {
             "table": table_name,
             "schema": schema,
@@ -25,10 +91,20 @@ class DBIntrospectionTool:
             ],
         }
 
-    def build_minimal_context(self, tables: List[Dict]) -> str:
+    def build_minimal_context(self, tables: List[Dict], question: Optional[str] = None, index_terms: Optional[List[str]] = None) -> str:
+        """Schema lines for the SQL prompt; with a question, the columns relevant to it (and keys) with types, the rest by name."""
+        if question and (self.max_columns > 0 or self.token_budget > 0):
+            selected = select_columns(tables, question, index_terms, self.max_columns, self.token_budget)
+        else:
+            selected = [(t.get("columns", []), []) for t in tables]
         parts = []
-        for t in tables:
-            cols = ", ".join([f"{c['name']} {c['type']}" for c in t.get("columns", [])])
+        for t, (columns, names) in zip(tables, selected):
+            cols = ", ".join([f"{c['name']} {c['type']}" for c in columns])
+            if names:
+                cols += f"; other columns: {', '.join(names)}"
+            omitted = len(t.get("columns", [])) - len(columns) - len(names)
+            if omitted:
+                cols += f" (+{omitted} more)"
             pk = ", ".join(t.get("primary_key", []) or [])
             fk_parts = []
             for fk in t.get("foreign_keys", []) or []:
@@ -36,7 +112,10 @@ class DBIntrospectionTool:
                 ref = f"{fk.get('referred_table')}({','.join(fk.get('referred_columns') or [])})"
                 fk_parts.append(f"FK({fk_cols}) -> {ref}")
             fk_line = "; ".join(fk_parts)
-            parts.append(f"Table {t['table']}: {cols}\nPK: {pk}\n{fk_line}")
+            # First line of the model docstring, when the schema catalog has one (see model_catalog.py)
+            summary = (t.get("description") or "").strip().split("\n")[0]
+            title = f"Table {t['table']} ({summary})" if summary else f"Table {t['table']}"
+            parts.append(f"{title}: {cols}\nPK: {pk}\n{fk_line}")
         return "\n\n".join(parts)
 
 
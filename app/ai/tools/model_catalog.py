@@ -0,0 +1,175 @@
+"""Static schema catalog compiled from the SQLAlchemy models, and drift against the live database.
+
+compile_models() turns the declarative models (app/models) into catalog entries of
+the shape SchemaCatalog serves: columns with Postgres type names, primary and
+foreign keys, indexes, plus what only the models know: the class docstring
+("description") and the `# Heading` comment a column is declared under ("group").
+scripts/build_schema_catalog.py writes the result to a versioned JSON file, which
+SchemaCatalog.load_static() reads at startup without touching the database.
+
+diff_schemas() compares such entries with live ones and reports missing and
+unexpected tables, and per table missing/unexpected columns and type, nullability
+and primary-key mismatches.
+"""
+import hashlib
+import inspect
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+CATALOG_FORMAT = 1
+
+# Placeholder comments in the stage models, not real column groups
+_PLACEHOLDER_COMMENT = re.compile(r"^(add your|example fields)", re.IGNORECASE)
+_COMMENT = re.compile(r"^\s+#\s*(.+?)\s*:?\s*$")
+_ASSIGNMENT = re.compile(r"^\s+(\w+)\s*(?::[^=]+)?=\s*\S")
+
+# Spellings SQLAlchemy's PostgreSQL compiler uses -> the name format_type() prints
+_TYPE_ALIASES = (
+    (re.compile(r"^varchar\b"), "character varying"),
+    (re.compile(r"^char\b"), "character"),
+    (re.compile(r"^float\b(?!\()"), "double precision"),
+    (re.compile(r"^decimal\b"), "numeric"),
+    (re.compile(r"^int\b"), "integer"),
+    (re.compile(r"^bool\b"), "boolean"),
+    (re.compile(r"^timestamp\b(?! with)(?!\s*\(\d+\) with)"), "timestamp without time zone"),
+    (re.compile(r"^time\b(?! with)(?!\s*\(\d+\) with)"), "time without time zone"),
+)
+
+
+def normalize_type(type_name: str) -> str:
+    """A column type as Postgres' format_type() prints it ("NUMERIC(10, 2)" -> "numeric(10,2)")."""
+    normalized = re.sub(r"\s*,\s*", ",", " ".join(str(type_name).lower().split()))
+    for pattern, replacement in _TYPE_ALIASES:
+        if pattern.search(normalized):
+            normalized = pattern.sub(replacement, normalized, count=1)
+            break
+    return normalized
+
+
+def _column_groups(cls) -> Dict[str, str]:
+    """Attribute name -> the `# Heading` comment it is declared under in the class body."""
+    try:
+        lines = inspect.getsource(cls).splitlines()
+    except (OSError, TypeError):
+        return {}
+    groups: Dict[str, str] = {}
+    group: Optional[str] = None
+    for line in lines[1:]:
+        comment = _COMMENT.match(line)
+        if comment:
+            if not _PLACEHOLDER_COMMENT.match(comment.group(1)):
+                group = comment.group(1)
+            continue
+        assignment = _ASSIGNMENT.match(line)
+        if assignment and group:
+            groups[assignment.group(1)] = group
+    return groups
+
+
+def _entry(mapper, dialect) -> Dict[str, Any]:
+    table = mapper.local_table
+    cls = mapper.class_
+    groups = _column_groups(cls)
+    attributes = {column.name: key for key, column in mapper.columns.items()}
+    columns = []
+    for column in table.columns:
+        item = {"name": column.name, "type": normalize_type(column.type.compile(dialect=dialect)), "nullable": bool(column.nullable)}
+        if column.comment:
+            item["comment"] = column.comment
+        group = groups.get(attributes.get(column.name, column.name))
+        if group:
+            item["group"] = group
+        columns.append(item)
+    indexes = [
+        {"name": index.name, "columns": [c.name for c in index.columns], "unique": bool(index.unique)}
+        for index in table.indexes
+    ]
+    for constraint in table.constraints:
+        if constraint.__visit_name__ == "unique_constraint":
+            names = [c.name for c in constraint.columns]
+            # Postgres' default name for an unnamed UNIQUE constraint
+            indexes.append({"name": constraint.name or f"{table.name}_{'_'.join(names)}_key", "columns": names, "unique": True})
+    entry: Dict[str, Any] = {
+        "table": table.name,
+        "schema": table.schema or "public",
+        "kind": "table",
+        "columns": columns,
+        "primary_key": [c.name for c in table.primary_key.columns],
+        "foreign_keys": [
+            {
+                "constrained_columns": [c.name for c in fk.columns],
+                "referred_schema": fk.referred_table.schema or "public",
+                "referred_table": fk.referred_table.name,
+                "referred_columns": [e.column.name for e in fk.elements],
+            }
+            for fk in sorted(table.foreign_key_constraints, key=lambda fk: [c.name for c in fk.columns])
+        ],
+        "indexes": sorted(indexes, key=lambda i: i["name"] or ""),
+    }
+    if table.comment:
+        entry["comment"] = table.comment
+    # Only the class's own docstring; getdoc() would fall back to BaseModel's
+    doc = cls.__dict__.get("__doc__")
+    if doc:
+        entry["description"] = inspect.cleandoc(doc)
+    return entry
+
+
+def compile_models(base) -> Dict[str, Any]:
+    """The catalog document for every mapped table of a declarative base."""
+    from sqlalchemy.dialects import postgresql
+
+    dialect = postgresql.dialect()
+    mappers = sorted(base.registry.mappers, key=lambda m: (m.local_table.schema or "public", m.local_table.name))
+    tables = [_entry(mapper, dialect) for mapper in mappers]
+    body = json.dumps(tables, sort_keys=True)
+    return {
+        "format": CATALOG_FORMAT,
+        # Content hash: unchanged models give the same version and the same file
+        "version": hashlib.sha256(body.encode()).hexdigest()[:16],
+        "source": "sqlalchemy models",
+        "tables": tables,
+    }
+
+
+def diff_schemas(expected: List[Dict[str, Any]], actual: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Drift between catalog entries (expected, e.g. from the models) and live ones; empty lists/dict when none."""
+    expected_by_name = {(t["schema"], t["table"]): t for t in expected}
+    actual_by_name = {(t["schema"], t["table"]): t for t in actual}
+    report: Dict[str, Any] = {
+        "missing_tables": sorted(f"{s}.{t}" for s, t in expected_by_name.keys() - actual_by_name.keys()),
+        "unexpected_tables": sorted(f"{s}.{t}" for s, t in actual_by_name.keys() - expected_by_name.keys()),
+        "tables": {},
+    }
+    for key in sorted(expected_by_name.keys() & actual_by_name.keys()):
+        want = {c["name"]: c for c in expected_by_name[key]["columns"]}
+        have = {c["name"]: c for c in actual_by_name[key]["columns"]}
+        drift: Dict[str, Any] = {}
+        missing = [name for name in want if name not in have]
+        unexpected = [name for name in have if name not in want]
+        types = [
+            {"column": name, "expected": want[name]["type"], "actual": have[name]["type"]}
+            for name in want if name in have and normalize_type(want[name]["type"]) != normalize_type(have[name]["type"])
+        ]
+        nullability = [
+            {"column": name, "expected": want[name]["nullable"], "actual": have[name]["nullable"]}
+            for name in want if name in have and want[name].get("nullable") != have[name].get("nullable")
+        ]
+        if missing:
+            drift["missing_columns"] = missing
+        if unexpected:
+            drift["unexpected_columns"] = unexpected
+        if types:
+            drift["type_mismatches"] = types
+        if nullability:
+            drift["nullable_mismatches"] = nullability
+        if expected_by_name[key]["primary_key"] != actual_by_name[key]["primary_key"]:
+            drift["primary_key"] = {"expected": expected_by_name[key]["primary_key"], "actual": actual_by_name[key]["primary_key"]}
+        if drift:
+            report["tables"][f"{key[0]}.{key[1]}"] = drift
+    return report
+
+
+def has_drift(report: Dict[str, Any]) -> bool:
+    return bool(report["missing_tables"] or report["unexpected_tables"] or report["tables"])
@@ -1,4 +1,5 @@
 from typing import Any, Dict, List, Optional
+import asyncio
 import logging
 
 try:
@@ -25,15 +26,27 @@ class SchemaRetrieverTool:
             self.embeddings = None
             return
         try:
-            pc = Pinecone(api_key=PINECONE_API_KEY)
-            self.index = pc.Index(self.index_name)
+            self._pc = Pinecone(api_key=PINECONE_API_KEY)
+            self.index = self._pc.Index(self.index_name)
         except Exception as e:
             self.logger.warning("Pinecone init/index failed: %s", e)
             self.enabled = False
             self.index = None
+        # Asyncio index is created on first use, inside the running event loop
+        self.async_index = None
+        self._async_index_lock = asyncio.Lock()
         # Using server-side embeddings and record search; no client-side embeddings
         self.embeddings = None
 
+    async def _get_async_index(self):
+        if self.async_index is None:
+            async with self._async_index_lock:
+                if self.async_index is None:
+                    # describe_index is a blocking control-plane call: keep it off the event loop
+                    description = await asyncio.to_thread(self._pc.describe_index, self.index_name)
+                    self.async_index = self._pc.IndexAsyncio(host=description.host)
+        return self.async_index
+
     def run(
         self,
         question: Optional[str] = None,
@@ -46,79 +59,108 @@ class SchemaRetrieverTool:
         if not self.enabled or not self.index:
             return []
         try:
-            query_text = " ".join(index_terms) if index_terms else (question or "")
-            self.logger.debug(f"------------------ query_text: {query_text} ------------------")
+            query_text = self._query_text(question, index_terms)
             if not query_text:
                 return []
-            # Build server-side search query for records (text field is 'chunk_text')
             from pinecone.db_data.request_factory import SearchQuery
             sq = SearchQuery(inputs={"text": query_text}, top_k=top_k)
-            # Optional rerank by 'chunk_text'
             res = self.index.search_records(namespace=namespace or "default", query=sq, rerank=None, fields=["*"])
-            # Normalize response → hits list
-            hits: List[Dict[str, Any]] = []
-            # Prefer dict access first
-            if isinstance(res, dict):
-                result_block = res.get("result") or res
-                hits = result_block.get("hits") or result_block.get("matches") or []
-            else:
-                result_block = getattr(res, "result", None) or res
-                hits = getattr(result_block, "hits", None) or getattr(result_block, "matches", None) or []
-
-            docs: List[Dict[str, Any]] = []
-            for h in hits or []:
-                # Each hit is a dict with keys like _id, _score, fields
-                if not isinstance(h, dict):
-                    # Try attribute-style
-                    fields = getattr(h, "fields", {}) or {}
-                    score = getattr(h, "_score", None) or getattr(h, "score", None)
-                else:
-                    fields = h.get("fields", {}) or {}
-                    score = h.get("_score") or h.get("score")
-
-                metadata = fields if isinstance(fields, dict) else {}
-                table = metadata.get("table")
-                domain = metadata.get("domain")
-                # Synthesized minimal text from table + index_terms if not explicitly stored
-                idx_terms = metadata.get("index_terms") or []
-                chunk_text = (metadata.get("chunk_text") or "").strip()
-                base_text = (
-                    chunk_text
-                    or ((table or "") + (" " + " ".join(idx_terms) if idx_terms else ""))
-                ).strip()
-                docs.append({
-                    "score": score,
-                    "text": base_text.strip(),
-                    "table": table,
-                    "domain": domain,
-                    "metadata": metadata,
-                })
-            # self.logger.debug(f"------------------ docs: {docs} ------------------")    
-            # Lightweight rerank by overlap with index_terms
-            if index_terms:
-                terms_set = {t.lower() for t in index_terms}
-                def overlap_bonus(d: Dict[str, Any]) -> float:
-                    md = d.get("metadata") or {}
-                    bonus = 0.0
-                    # table name overlap
-                    tbl = (md.get("table") or "").lower()
-                    if tbl and any(t in tbl for t in terms_set):
-                        bonus += 0.15
-                    # index_terms metadata overlap
-                    meta_terms = md.get("index_terms") or []
-                    if isinstance(meta_terms, list):
-                        inter = terms_set.intersection({str(x).lower() for x in meta_terms})
-                        bonus += 0.05 * len(inter)
-                    return bonus
-                for d in docs:
-                    base = d.get("score") or 0.0
-                    d["score"] = base + overlap_bonus(d)
-                docs.sort(key=lambda x: x.get("score") or 0.0, reverse=True)
-            return docs
+            return self._to_docs(res, index_terms)
+        except Exception as e:
+            self.logger.exception("------------------ Pinecone retrieval failed ------------------")
+            return []
+
+    async def arun(
+        self,
+        question: Optional[str] = None,
+        namespace: Optional[str] = "default",
+        top_k: int = 8,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        index_terms: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Async variant of run() using Pinecone's asyncio data-plane client."""
+        if not self.enabled or not self.index:
+            return []
+        try:
+            query_text = self._query_text(question, index_terms)
+            if not query_text:
+                return []
+            from pinecone.db_data.request_factory import SearchQuery
+            sq = SearchQuery(inputs={"text": query_text}, top_k=top_k)
+            index = await self._get_async_index()
+            res = await index.search_records(namespace=namespace or "default", query=sq, rerank=None, fields=["*"])
+            return self._to_docs(res, index_terms)
         except Exception as e:
             self.logger.exception("------------------ Pinecone retrieval failed ------------------")
             return []
 
+    def _query_text(self, question: Optional[str], index_terms: Optional[List[str]]) -> str:
+        query_text = " ".join(index_terms) if index_terms else (question or "")
+        self.logger.debug(f"------------------ query_text: {query_text} ------------------")
+        return query_text
+
+    @staticmethod
+    def _to_docs(res: Any, index_terms: Optional[List[str]]) -> List[Dict[str, Any]]:
+        # Normalize response → hits list
+        hits: List[Dict[str, Any]] = []
+        # Prefer dict access first
+        if isinstance(res, dict):
+            result_block = res.get("result") or res
+            hits = result_block.get("hits") or result_block.get("matches") or []
+        else:
+            result_block = getattr(res, "result", None) or res
+            hits = getattr(result_block, "hits", None) or getattr(result_block, "matches", None) or []
+
+        docs: List[Dict[str, Any]] = []
+        for h in hits or []:
+            # Each hit is a dict with keys like _id, _score, fields
+            if not isinstance(h, dict):
+                # Try attribute-style
+                fields = getattr(h, "fields", {}) or {}
+                score = getattr(h, "_score", None) or getattr(h, "score", None)
+            else:
+                fields = h.get("fields", {}) or {}
+                score = h.get("_score") or h.get("score")
+
+            metadata = fields if isinstance(fields, dict) else {}
+            table = metadata.get("table")
+            domain = metadata.get("domain")
+            # Synthesized minimal text from table + index_terms if not explicitly stored
+            idx_terms = metadata.get("index_terms") or []
+            chunk_text = (metadata.get("chunk_text") or "").strip()
+            base_text = (
+                chunk_text
+                or ((table or "") + (" " + " ".join(idx_terms) if idx_terms else ""))
+            ).strip()
+            docs.append({
+                "score": score,
+                "text": base_text.strip(),
+                "table": table,
+                "domain": domain,
+                "metadata": metadata,
+            })
+        # Lightweight rerank by overlap with index_terms
+        if index_terms:
+            terms_set = {t.lower() for t in index_terms}
+            def overlap_bonus(d: Dict[str, Any]) -> float:
+                md = d.get("metadata") or {}
+                bonus = 0.0
+                # table name overlap
+                tbl = (md.get("table") or "").lower()
+                if tbl and any(t in tbl for t in terms_set):
+                    bonus += 0.15
+                # index_terms metadata overlap
+                meta_terms = md.get("index_terms") or []
+                if isinstance(meta_terms, list):
+                    inter = terms_set.intersection({str(x).lower() for x in meta_terms})
+                    bonus += 0.05 * len(inter)
+                return bonus
+            for d in docs:
+                base = d.get("score") or 0.0
+                d["score"] = base + overlap_bonus(d)
+            docs.sort(key=lambda x: x.get("score") or 0.0, reverse=True)
+        return docs
+
     @staticmethod
     def build_prompt_context(retrieved_docs: List[Dict[str, Any]], max_chars: int = 3000) -> str:
         chunks: List[str] = []
@@ -0,0 +1,287 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.ai.tools.model_catalog import CATALOG_FORMAT, diff_schemas, has_drift
+from app.core.database import replica_router
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA_FILTER = "n.nspname NOT IN ('pg_catalog', 'information_schema') AND n.nspname NOT LIKE 'pg\\_%'"
+# :only limits a read to some tables, named as quote_ident() prints them (NULL: every table)
+_ONLY_FILTER = (
+    "(CAST(:only AS text[]) IS NULL"
+    " OR quote_ident(n.nspname) || '.' || quote_ident(c.relname) = ANY(CAST(:only AS text[])))"
+)
+
+# Every column of every table/view, with types as Postgres prints them and comments
+_COLUMNS_SQL = text(
+    f"""
+    SELECT n.nspname AS schema, c.relname AS table, quote_ident(n.nspname) || '.' || quote_ident(c.relname) AS relation,
+           c.relkind AS kind, td.description AS table_comment,
+           a.attname AS column, format_type(a.atttypid, a.atttypmod) AS type, a.attnotnull AS not_null,
+           cd.description AS comment
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+    LEFT JOIN pg_description td ON td.objoid = c.oid AND td.classoid = 'pg_class'::regclass AND td.objsubid = 0
+    LEFT JOIN pg_description cd ON cd.objoid = c.oid AND cd.classoid = 'pg_class'::regclass AND cd.objsubid = a.attnum
+    WHERE c.relkind IN ('r', 'p', 'v', 'm', 'f') AND NOT c.relispartition AND {_SCHEMA_FILTER} AND {_ONLY_FILTER}
+    ORDER BY n.nspname, c.relname, a.attnum
+    """
+)
+
+# Primary keys, foreign keys and (non-primary) indexes, with column names in key order
+_KEYS_SQL = text(
+    f"""
+    SELECT n.nspname AS schema, c.relname AS table, CAST(con.contype AS text) AS kind, con.conname AS name,
+           ARRAY(SELECT a.attname FROM unnest(con.conkey) WITH ORDINALITY AS k(attnum, i)
+                 JOIN pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.attnum ORDER BY k.i) AS columns,
+           rn.nspname AS referred_schema, rc.relname AS referred_table,
+           ARRAY(SELECT a.attname FROM unnest(con.confkey) WITH ORDINALITY AS k(attnum, i)
+                 JOIN pg_attribute a ON a.attrelid = con.confrelid AND a.attnum = k.attnum ORDER BY k.i) AS referred_columns
+    FROM pg_constraint con
+    JOIN pg_class c ON c.oid = con.conrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN pg_class rc ON rc.oid = con.confrelid
+    LEFT JOIN pg_namespace rn ON rn.oid = rc.relnamespace
+    WHERE con.contype IN ('p', 'f') AND {_SCHEMA_FILTER} AND {_ONLY_FILTER}
+    UNION ALL
+    SELECT n.nspname, c.relname, CASE WHEN i.indisunique THEN 'u' ELSE 'i' END, ic.relname,
+           ARRAY(SELECT a.attname FROM unnest(CAST(i.indkey AS int2[])) WITH ORDINALITY AS k(attnum, i)
+                 JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum ORDER BY k.i),
+           NULL, NULL, NULL
+    FROM pg_index i
+    JOIN pg_class c ON c.oid = i.indrelid
+    JOIN pg_class ic ON ic.oid = i.indexrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE NOT i.indisprimary AND {_SCHEMA_FILTER} AND {_ONLY_FILTER}
+    ORDER BY 1, 2, 4
+    """
+)
+
+_KINDS = {"r": "table", "p": "table", "v": "view", "m": "materialized view", "f": "foreign table"}
+
+
+class SchemaCatalog:
+    """Columns, types, keys, indexes and comments of every table, loaded in bulk and served from memory.
+
+    load() reads the whole catalog in two pg_catalog queries (columns with comments;
+    constraints and indexes), so building a prompt's schema section needs no database
+    round trip. Entries have the shape DBIntrospectionTool returns, plus "kind",
+    "comment" and "indexes" (and per column "nullable"/"comment"). Unqualified names
+    resolve through the connection's search_path, as they would in a query.
+    refresh() re-reads only the tables a schema change touched (see app/core/schema_versions.py).
+
+    load_static() serves the catalog compiled from the models (app/ai/tools/model_catalog.py)
+    until the live load replaces it, so a cold start knows the schema before its first
+    query. Live entries keep the models' "description" and column "group" annotations,
+    and the differences between the two are kept as the drift report.
+    """
+
+    name = "schema_catalog"
+    description = "In-memory catalog of every table's columns, types, keys, indexes and comments."
+
+    def __init__(self):
+        self._tables: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        # quote_ident-qualified name -> key in _tables
+        self._relations: Dict[str, Tuple[str, str]] = {}
+        self._search_path: List[str] = ["public"]
+        self._lock = asyncio.Lock()
+        self.loaded_at: Optional[float] = None
+        self.load_ms: Optional[float] = None
+        # "static" (compiled from the models) until the first live load, then "live"
+        self.source: Optional[str] = None
+        self.static_version: Optional[str] = None
+        self._static: List[Dict[str, Any]] = []
+        self.drift: Optional[Dict[str, Any]] = None
+        self._live_task: Optional[asyncio.Task] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.loaded_at is not None
+
+    async def load(self) -> None:
+        start = time.perf_counter()
+        async with replica_router.connect() as conn:
+            search_path = (await conn.execute(text("SELECT current_schemas(false)"))).scalar_one()
+            columns = (await conn.execute(_COLUMNS_SQL, {"only": None})).all()
+            keys = (await conn.execute(_KEYS_SQL, {"only": None})).all()
+        tables, self._relations = self._build(columns, keys)
+        self._tables = self._annotate(tables)
+        self._search_path = list(search_path) or ["public"]
+        self.loaded_at = time.time()
+        self.load_ms = round((time.perf_counter() - start) * 1000, 2)
+        self.source = "live"
+        logger.info(f"Schema catalog loaded: {len(self._tables)} tables in {self.load_ms} ms")
+        if self._static:
+            self.drift = diff_schemas(self._static, list(tables.values()))
+            if has_drift(self.drift):
+                logger.warning(
+                    f"Schema drift against the model catalog {self.static_version}: "
+                    f"{len(self.drift['missing_tables'])} missing tables, {len(self.drift['unexpected_tables'])} unexpected, "
+                    f"{len(self.drift['tables'])} tables with column differences (scripts/build_schema_catalog.py --drift)"
+                )
+
+    def load_static(self, path: str) -> bool:
+        """Serve the catalog file compiled from the models; False when it is missing or of another format."""
+        if not os.path.exists(path):
+            return False
+        with open(path, encoding="utf-8") as f:
+            document = json.load(f)
+        if document.get("format") != CATALOG_FORMAT:
+            logger.warning(f"Ignoring schema catalog {path}: format {document.get('format')}, expected {CATALOG_FORMAT}")
+            return False
+        self._static = document["tables"]
+        self.static_version = document.get("version")
+        if self.source != "live":
+            self._tables = {(t["schema"], t["table"]): t for t in self._static}
+            self.loaded_at = time.time()
+            self.source = "static"
+        logger.info(f"Schema catalog {self.static_version} loaded from {path}: {len(self._static)} tables")
+        return True
+
+    def load_in_background(self) -> None:
+        """Start the live load unless one is already running (used while serving the static catalog)."""
+        if self._live_task is None or self._live_task.done():
+            self._live_task = asyncio.ensure_future(self._load_logged())
+
+    async def _load_logged(self) -> None:
+        try:
+            async with self._lock:
+                await self.load()
+        except Exception:
+            logger.exception("Schema catalog live load failed; serving the model catalog")
+
+    async def ensure_loaded(self) -> None:
+        if self.source == "static":
+            self.load_in_background()
+        if self.loaded:
+            return
+        async with self._lock:
+            if not self.loaded:
+                await self.load()
+
+    async def refresh(self, relations: Iterable[str]) -> None:
+        """Re-read these tables (quote_ident-qualified); dropped ones are removed, new ones added."""
+        only = sorted(set(relations))
+        if not only:
+            return
+        async with self._lock:
+            if not self.loaded:
+                # The first ensure_loaded() reads everything anyway
+                return
+            async with replica_router.connect() as conn:
+                columns = (await conn.execute(_COLUMNS_SQL, {"only": only})).all()
+                keys = (await conn.execute(_KEYS_SQL, {"only": only})).all()
+            tables, relations = self._build(columns, keys)
+            tables = self._annotate(tables)
+            for relation in only:
+                key = self._relations.pop(relation, None)
+                if key is not None:
+                    self._tables.pop(key, None)
+            self._tables.update(tables)
+            self._relations.update(relations)
+        logger.info(f"Schema catalog refreshed {len(only)} tables ({len(tables)} still exist)")
+
+    @staticmethod
+    def _build(columns, keys) -> Tuple[Dict[Tuple[str, str], Dict[str, Any]], Dict[str, Tuple[str, str]]]:
+        tables: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        relations: Dict[str, Tuple[str, str]] = {}
+        for row in columns:
+            key = (row.schema, row.table)
+            entry = tables.get(key)
+            if entry is None:
+                relations[row.relation] = key
+                entry = tables[key] = {
+                    "table": row.table,
+                    "schema": row.schema,
+                    "kind": _KINDS.get(row.kind, row.kind),
+                    "columns": [],
+                    "primary_key": [],
+                    "foreign_keys": [],
+                    "indexes": [],
+                }
+                if row.table_comment:
+                    entry["comment"] = row.table_comment
+            column = {"name": row.column, "type": row.type, "nullable": not row.not_null}
+            if row.comment:
+                column["comment"] = row.comment
+            entry["columns"].append(column)
+        for row in keys:
+            entry = tables.get((row.schema, row.table))
+            if entry is None:
+                continue
+            if row.kind == "p":
+                entry["primary_key"] = list(row.columns)
+            elif row.kind == "f":
+                entry["foreign_keys"].append({
+                    "constrained_columns": list(row.columns),
+                    "referred_schema": row.referred_schema,
+                    "referred_table": row.referred_table,
+                    "referred_columns": list(row.referred_columns),
+                })
+            else:
+                entry["indexes"].append({"name": row.name, "columns": list(row.columns), "unique": row.kind == "u"})
+        return tables, relations
+
+    def _annotate(self, tables: Dict[Tuple[str, str], Dict[str, Any]]) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """Copy the model catalog's description and column groups onto live entries of the same tables."""
+        static = {(t["schema"], t["table"]): t for t in self._static}
+        out = {}
+        for key, entry in tables.items():
+            model = static.get(key)
+            if model is None:
+                out[key] = entry
+                continue
+            groups = {c["name"]: c["group"] for c in model["columns"] if c.get("group")}
+            entry = {**entry, "columns": [{**c, "group": groups[c["name"]]} if c["name"] in groups else c for c in entry["columns"]]}
+            if model.get("description"):
+                entry["description"] = model["description"]
+            out[key] = entry
+        return out
+
+    def resolve(self, name: str, schema: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        name = (name or "").replace('"', "").strip()
+        if schema is None and "." in name:
+            schema, _, name = name.rpartition(".")
+        for candidate in [schema] if schema else self._search_path:
+            entry = self._tables.get((candidate, name)) or self._tables.get((candidate, name.lower()))
+            if entry is not None:
+                return entry
+        return None
+
+    def tables(self, names: List[str], schema: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Entries for names in order; unknown names are skipped, as failed introspection was."""
+        out = []
+        for name in names:
+            entry = self.resolve(name, schema)
+            if entry is not None:
+                # Callers match results back to the names they asked for
+                out.append(entry if entry["table"] == name else {**entry, "table": name})
+        return out
+
+    def entries(self) -> List[Dict[str, Any]]:
+        return [self._tables[key] for key in sorted(self._tables)]
+
+    def stats(self) -> Dict[str, Any]:
+        drift = None
+        if self.drift is not None:
+            drift = {
+                "missing_tables": len(self.drift["missing_tables"]),
+                "unexpected_tables": len(self.drift["unexpected_tables"]),
+                "tables_with_column_drift": len(self.drift["tables"]),
+            }
+        return {
+            "tables": len(self._tables),
+            "source": self.source,
+            "static_version": self.static_version,
+            "loaded_at": self.loaded_at,
+            "load_ms": self.load_ms,
+            "drift": drift,
+        }
@@ -0,0 +1,128 @@
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+# Preferred date columns for the default date-range rewrite, before any other date/timestamp column
+DATE_COLUMN_PREFERENCE = ("posted_date", "date", "report_date", "purchase_date", "order_date")
+
+# Words that can follow a table reference but are not an alias
+_NOT_ALIAS = (
+    "where|join|on|using|group|order|limit|offset|left|right|inner|full|outer|cross|natural|lateral|"
+    "union|intersect|except|having|window|fetch|for"
+)
+
+_DATE_COLUMNS_SQL = text(
+    """
+    SELECT a.attname
+    FROM pg_attribute a
+    WHERE a.attrelid = to_regclass(:relation) AND a.attnum > 0 AND NOT a.attisdropped
+      AND a.atttypid IN ('date'::regtype, 'timestamp'::regtype, 'timestamptz'::regtype)
+    ORDER BY a.attnum
+    """
+)
+
+
+def bounded_sql(sql: str, max_rows: int, where: Optional[str] = None, order_by: Optional[str] = None) -> str:
+    """Wrap a query in an outer LIMIT; one row past max_rows tells the caller the result was cut.
+
+    where/order_by (over the query's output columns) apply a keyset page, see app/core/result_cursor.py.
+    """
+    outer = f" WHERE {where}" if where else ""
+    outer += f" ORDER BY {order_by}" if order_by else ""
+    return f"SELECT * FROM (\n{sql}\n) AS bounded_result{outer} LIMIT {max_rows + 1}"
+
+
+class SQLCostGate:
+    name = "sql_cost_gate"
+    description = "Estimate a query's cost with a planner-only EXPLAIN; rewrite or reject queries over budget."
+
+    def __init__(self, max_cost: float, max_rows: float, date_range_days: int, row_cap: int):
+        self.max_cost = max_cost
+        self.max_rows = max_rows
+        self.date_range_days = date_range_days
+        self.row_cap = row_cap
+
+    async def check(self, conn: AsyncConnection, sql: str, params: Optional[Dict[str, Any]] = None) -> Tuple[str, Dict[str, Any]]:
+        """Return (sql_to_run, plan_summary).
+
+        When the plan is over budget, a default date range is added to the scanned tables
+        that have a date column and no filter on it; plan_summary["rewrites"] lists what
+        was changed. If no rewrite brings the plan under budget, plan_summary["rejected"]
+        holds the reason and the query must not run.
+        """
+        summary = await self._explain(conn, sql, params)
+        reason = self._over_budget(summary)
+        if reason is None:
+            return sql, summary
+        rewritten, rewrites = await self._add_date_ranges(conn, sql, summary)
+        if rewrites:
+            rewritten_summary = await self._explain(conn, rewritten, params)
+            rewritten_summary.update(rewrites=rewrites, original=summary)
+            reason = self._over_budget(rewritten_summary)
+            if reason is None:
+                rewritten_summary["rewritten_sql"] = rewritten
+                return rewritten, rewritten_summary
+            summary = rewritten_summary
+        summary["rejected"] = reason
+        return sql, summary
+
+    async def _explain(self, conn: AsyncConnection, sql: str, params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        # Planner only: EXPLAIN without ANALYZE does not execute the query
+        result = await conn.execute(text("EXPLAIN (FORMAT JSON) " + bounded_sql(sql, self.row_cap)), params or {})
+        raw = result.scalar()
+        plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+        scans: List[Dict[str, Any]] = []
+        max_rows = 0.0
+
+        def walk(node: Dict[str, Any]) -> None:
+            nonlocal max_rows
+            max_rows = max(max_rows, float(node.get("Plan Rows", 0)))
+            if node.get("Relation Name"):
+                scans.append({"relation": node["Relation Name"], "node": node["Node Type"], "rows": node.get("Plan Rows")})
+            for child in node.get("Plans", []):
+                walk(child)
+
+        walk(plan)
+        return {
+            "node": plan.get("Node Type"),
+            "total_cost": plan.get("Total Cost"),
+            "max_rows": max_rows,
+            "scans": sorted(scans, key=lambda s: -(s["rows"] or 0))[:5],
+        }
+
+    def _over_budget(self, summary: Dict[str, Any]) -> Optional[str]:
+        if summary["total_cost"] > self.max_cost:
+            return f"estimated cost {summary['total_cost']:.0f} exceeds SQL_MAX_PLAN_COST={self.max_cost:.0f}"
+        if summary["max_rows"] > self.max_rows:
+            return f"estimated {summary['max_rows']:.0f} rows in a plan step exceeds SQL_MAX_PLAN_ROWS={self.max_rows:.0f}"
+        return None
+
+    async def _add_date_ranges(self, conn: AsyncConnection, sql: str, summary: Dict[str, Any]) -> Tuple[str, List[str]]:
+        rewrites: List[str] = []
+        for relation in dict.fromkeys(s["relation"] for s in summary["scans"] if s["node"] == "Seq Scan"):
+            columns = [r[0] for r in (await conn.execute(_DATE_COLUMNS_SQL, {"relation": relation})).all()]
+            if not columns:
+                continue
+            column = next((c for c in DATE_COLUMN_PREFERENCE if c in columns), columns[0])
+            if re.search(rf"\b{re.escape(column)}\b", sql, re.IGNORECASE):
+                # The query already constrains (or at least uses) this date column
+                continue
+            # Shadow the table with a filtered subquery under the same name/alias, so the
+            # rest of the query (qualified columns, joins) is unchanged
+            reference = re.compile(
+                rf"\b(from|join)\s+((?:\"?\w+\"?\.)?\"?{re.escape(relation)}\"?)(?![\w.])"
+                rf"(?:\s+(?:as\s+)?(?!(?:{_NOT_ALIAS})\b)([A-Za-z_]\w*))?",
+                re.IGNORECASE,
+            )
+            predicate = f"\"{column}\" >= current_date - interval '{int(self.date_range_days)} days'"
+
+            def shadow(m: re.Match) -> str:
+                return f"{m.group(1)} (SELECT * FROM {m.group(2)} WHERE {predicate}) AS {m.group(3) or relation}"
+
+            sql, count = reference.subn(shadow, sql)
+            if count:
+                rewrites.append(f"{relation}.{column} >= current_date - {int(self.date_range_days)} days")
+        return sql, rewrites
@@ -1,17 +1,145 @@
-from fastapi import APIRouter
+import asyncio
+import logging
+from fastapi import APIRouter, Request
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
-from typing import Any, Dict, Optional
-from app.services.ai_agent_service import answer_business_question
+from typing import Any, AsyncIterator, Awaitable, Dict, List, Literal, Optional, TypeVar
+from app.services.ai_agent_service import (
+    answer_business_question,
+    answer_business_questions,
+    fetch_result_page,
+    stream_business_question,
+)
 from app.ai.schema.context import SCHEMA_CONTEXT
+from app.core.fast_json import FastJSONResponse, dumps
+from app.core.instrumentation import timing_stats
+from app.core.metrics import REQUESTS_CANCELLED
+from app.ai.fast_router import fast_router
+from app.core.database import replica_router
+from app.ai.agent_graph import result_cache, schema_catalog, schema_versions
+from app.services import result_encoding
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+T = TypeVar("T")
+
+# Sent in place of a response nobody will read (nginx's "client closed request")
+CLIENT_CLOSED_REQUEST = 499
+
+# Shape of a JSON answer's rows: list of dicts, column arrays, or an Arrow/Parquet body
+Encoding = Literal["rows", "columnar", "arrow", "parquet"]
+
 class AskRequest(BaseModel):
     question: str
     output_format: Optional[str] = "json"
     db_schema: Optional[str] = None
+    encoding: Encoding = "rows"
+
+class AskBatchRequest(BaseModel):
+    questions: List[str]
+    output_format: Optional[str] = "json"
+    db_schema: Optional[str] = None
+    # Concurrent questions; capped by ASK_BATCH_PARALLELISM
+    parallelism: Optional[int] = None
+
+async def _until_disconnected(http_request: Request, endpoint: str, work: Awaitable[T]) -> Optional[T]:
+    """Await work, cancelling it if the client disconnects first (returns None then).
+
+    Cancellation runs through the graph: pending LLM requests are aborted, and psycopg
+    sends a cancel request for a running statement so the Postgres backend and pooled
+    connection are released at once. Coalesced identical requests keep their shared
+    run until the last of them disconnects (SingleFlight).
+    """
+    task = asyncio.ensure_future(work)
+
+    async def disconnected() -> None:
+        # The body has been read already, so the next message is the disconnect
+        while (await http_request.receive())["type"] != "http.disconnect":
+            pass
 
-@router.post("/ask")
-def ask_endpoint(request: AskRequest) -> Dict[str, Any]:
+    watcher = asyncio.ensure_future(disconnected())
+    try:
+        await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+    if task.done():
+        return task.result()
+    task.cancel()
+    REQUESTS_CANCELLED.labels(endpoint).inc()
+    logger.info(f"Client disconnected; cancelled {endpoint}")
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    return None
+
+@router.post("/ask", response_class=FastJSONResponse)
+async def ask_endpoint(request: AskRequest, http_request: Request) -> Response:
+    schema_context = SCHEMA_CONTEXT
+    payload = await _until_disconnected(
+        http_request, "/ask",
+        answer_business_question(request.question, schema_context, request.output_format, request.db_schema),
+    )
+    if payload is None:
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    return _encoded(payload, request.encoding)
+
+@router.get("/results/{token}", response_class=FastJSONResponse)
+async def results_endpoint(token: str, http_request: Request, encoding: Encoding = "rows") -> Response:
+    # Next page of a truncated answer: pass its "continuation"; each page carries the next one
+    payload = await _until_disconnected(http_request, "/results", fetch_result_page(token))
+    if payload is None:
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    if payload.get("error"):
+        return FastJSONResponse(payload, status_code=400)
+    return _encoded(payload, encoding)
+
+def _encoded(payload: Dict[str, Any], encoding: str) -> Response:
+    if encoding == "columnar":
+        return FastJSONResponse(result_encoding.encode_columnar(payload))
+    if encoding in ("arrow", "parquet") and result_encoding.tabular_rows(payload) is not None:
+        body, media_type = result_encoding.encode_binary(payload, encoding)
+        return Response(body, media_type=media_type)
+    return FastJSONResponse(payload)
+
+@router.post("/ask/batch", response_class=FastJSONResponse)
+async def ask_batch_endpoint(request: AskBatchRequest, http_request: Request) -> Response:
     schema_context = SCHEMA_CONTEXT
-    return answer_business_question(request.question, schema_context, request.output_format, request.db_schema)
\ No newline at end of file
+    payload = await _until_disconnected(
+        http_request, "/ask/batch",
+        answer_business_questions(request.questions, schema_context, request.output_format, request.db_schema, request.parallelism),
+    )
+    if payload is None:
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    return FastJSONResponse(payload)
+
+async def _sse(events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    # One SSE message per graph event; the event name goes in the "event:" field
+    async for event in events:
+        name = event.pop("event", "message")
+        yield f"event: {name}\ndata: {dumps(event).decode()}\n\n"
+    yield "event: done\ndata: {}\n\n"
+
+@router.post("/ask/stream")
+async def ask_stream_endpoint(request: AskRequest) -> StreamingResponse:
+    schema_context = SCHEMA_CONTEXT
+    events = stream_business_question(request.question, schema_context, request.output_format, request.db_schema)
+    return StreamingResponse(
+        _sse(events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/timings")
+async def timings_endpoint() -> Dict[str, Any]:
+    # In-process aggregate of per-node spans since startup, plus fast-path routing, replica, result-cache and schema stats
+    return {
+        **timing_stats.summary(),
+        "fast_router": fast_router.stats(),
+        "replicas": replica_router.status(),
+        "result_cache": result_cache.stats() if result_cache is not None else None,
+        "schema_catalog": schema_catalog.stats() if schema_catalog is not None else None,
+        "schema_versions": schema_versions.stats() if schema_versions is not None else None,
+    }
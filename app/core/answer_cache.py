@@ -0,0 +1,243 @@
+"""Versioned answer cache in front of the agent graph.
+
+Entries are keyed by a fingerprint of (normalized question, output_format,
+db_schema, client context, live schema fingerprint) and store the answer payload
+together with the data watermark of the tables its SQL read (see
+app/core/freshness.py). A lookup compares it with the current watermarks from a
+WatermarkProbe (app/core/result_cache.py: read through replica_router, cached per
+table for a few seconds, shared with the result cache) and treats any change as a
+miss, so a cached answer is at most that many seconds behind the last ingest job.
+
+Answers whose SQL is relative to the current date (current_date/now(), or a
+cost-gate date-range rewrite; data_watermark["time_dependent"]) are stamped with the
+UTC day they were computed and only hit on that day, like result-cache entries.
+
+With a SchemaVersionProbe (app/core/schema_versions.py) the live schema is not part
+of the key: each entry records the schema version of the tables its SQL read (of
+the whole schema when it read none), and only entries whose tables changed miss.
+
+Backends share a tiny get/set/delete interface:
+- MemoryCacheBackend: per-process LRU with TTL; keeps the payload as is, so a hit
+  encodes exactly like the fresh answer (datetimes stay datetimes)
+- SQLiteCacheBackend: a SQLite file shared by every worker on the host; entries are
+  encoded with app/core/fast_json.py, the response encoder
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import orjson
+
+from app.core import fast_json, freshness
+from app.core.metrics import record_cache
+from app.core.result_cache import WatermarkProbe, utc_today
+from app.core.schema_versions import SchemaVersionProbe
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryCacheBackend:
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires, entry = item
+            if time.time() >= expires:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl_seconds, entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class SQLiteCacheBackend:
+    """LRU/TTL cache in a SQLite file (WAL mode), so several uvicorn workers share entries."""
+
+    def __init__(self, path: str, max_entries: int, ttl_seconds: float):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                "key TEXT PRIMARY KEY, entry TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS answers_accessed_at ON answers (accessed_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._connect() as db:
+            row = db.execute("SELECT entry, expires_at FROM answers WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now >= row[1]:
+                db.execute("DELETE FROM answers WHERE key = ?", (key,))
+                return None
+            db.execute("UPDATE answers SET accessed_at = ? WHERE key = ?", (now, key))
+        return orjson.loads(row[0])
+
+    def set(self, key: str, entry: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO answers (key, entry, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, fast_json.dumps(entry).decode(), now + self.ttl_seconds, now),
+            )
+            db.execute("DELETE FROM answers WHERE expires_at <= ?", (now,))
+            db.execute(
+                "DELETE FROM answers WHERE key IN "
+                "(SELECT key FROM answers ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def delete(self, key: str) -> None:
+        with self._connect() as db:
+            db.execute("DELETE FROM answers WHERE key = ?", (key,))
+
+
+class AnswerCache:
+    # Excel/PDF answers point at files generated per request, so only inline formats are cached
+    CACHEABLE_FORMATS = ("json", "text")
+
+    def __init__(
+        self,
+        backend,
+        fingerprint_ttl_seconds: float,
+        watermarks: WatermarkProbe,
+        schema_versions: Optional[SchemaVersionProbe] = None,
+    ):
+        self.backend = backend
+        self.schema_fingerprint = freshness.SchemaFingerprint(fingerprint_ttl_seconds)
+        self.watermarks = watermarks
+        self.schema_versions = schema_versions
+
+    async def _call(self, fn, *args):
+        # SQLite work happens off the event loop; the memory backend is a dict lookup
+        if isinstance(self.backend, MemoryCacheBackend):
+            return fn(*args)
+        return await asyncio.to_thread(fn, *args)
+
+    def _schema_versions(self, watermark: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Schema versions an answer depends on: of the tables it read, or of the whole schema."""
+        if not watermark:
+            return {"*": self.schema_versions.version} if self.schema_versions.loaded else None
+        return self.schema_versions.versions_for(watermark)
+
+    async def key(self, question: str, output_format: str, db_schema: Optional[str], context: str) -> str:
+        schema = "" if self.schema_versions is not None else await self.schema_fingerprint.get()
+        parts = [question, output_format or "json", db_schema or "", context or "", schema]
+        return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+    async def lookup(
+        self, question: str, output_format: str, db_schema: Optional[str], context: str
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """Return (payload, key): payload is None on a miss; pass key to store() after answering.
+
+        question is expected to be normalized already. key is None when the answer
+        must not be cached (unsupported format or the cache could not be consulted).
+        """
+        if output_format not in self.CACHEABLE_FORMATS:
+            return None, None
+        try:
+            key = await self.key(question, output_format, db_schema, context)
+            entry = await self._call(self.backend.get, key)
+            if entry is not None and self.schema_versions is not None:
+                schema = entry.get("schema")
+                if schema is None or schema != self._schema_versions(entry.get("watermark") or {}):
+                    logger.debug(f"Answer cache entry outdated by a schema change: {schema}")
+                    await self._call(self.backend.delete, key)
+                    entry = None
+            if entry is not None and entry.get("day") not in (None, utc_today()):
+                logger.debug(f"Answer cache entry for a date-relative query outdated by day rollover: {entry['day']}")
+                await self._call(self.backend.delete, key)
+                entry = None
+            if entry is not None:
+                watermark = entry.get("watermark") or {}
+                if watermark:
+                    current = await self.watermarks.get(sorted(watermark))
+                    if current != watermark:
+                        logger.debug(f"Answer cache entry outdated by ingest: {watermark} -> {current}")
+                        await self._call(self.backend.delete, key)
+                        entry = None
+        except Exception:
+            logger.exception("Answer cache lookup failed")
+            return None, None
+        record_cache("answer", entry is not None)
+        if entry is None:
+            return None, key
+        return {**entry["payload"], "cached": True}, key
+
+    async def store(self, key: Optional[str], payload: Dict[str, Any]) -> None:
+        """Cache payload when its run completed cleanly and its data dependencies are known.
+
+        Runs flagged in AgentState.degraded (errors, supervisor failures, fallback
+        answers) are never cached, nor are answers without a data_watermark.
+        """
+        if key is None or not isinstance(payload, dict) or payload.get("degraded"):
+            return
+        data_watermark = payload.get("data_watermark")
+        if data_watermark is None or data_watermark.get("tables") is None:
+            # No SQL ran (nothing to check against ingest), or it read a table without
+            # ingest watermark columns: freshness cannot be checked
+            return
+        entry = {
+            "payload": payload,
+            "watermark": data_watermark["tables"],
+            "day": utc_today() if data_watermark.get("time_dependent") else None,
+        }
+        if self.schema_versions is not None:
+            entry["schema"] = self._schema_versions(entry["watermark"])
+            if entry["schema"] is None:
+                # Versions not read yet: the entry could not be validated later
+                return
+        # Read in the query's own snapshot: saves the next lookup a probe
+        self.watermarks.update(entry["watermark"])
+        try:
+            await self._call(self.backend.set, key, entry)
+        except Exception:
+            logger.exception("Answer cache store failed")
+
+
+def build_answer_cache(
+    backend: str,
+    path: str,
+    max_entries: int,
+    ttl_seconds: float,
+    fingerprint_ttl_seconds: float,
+    watermarks: WatermarkProbe,
+    schema_versions: Optional[SchemaVersionProbe] = None,
+) -> Optional[AnswerCache]:
+    if backend == "memory":
+        return AnswerCache(MemoryCacheBackend(max_entries, ttl_seconds), fingerprint_ttl_seconds, watermarks, schema_versions)
+    if backend == "sqlite":
+        return AnswerCache(SQLiteCacheBackend(path, max_entries, ttl_seconds), fingerprint_ttl_seconds, watermarks, schema_versions)
+    return None
@@ -1,4 +1,5 @@
 import os
+import secrets
 from dotenv import load_dotenv
 
 # Load environment variables from a .env file
@@ -11,4 +12,88 @@ PINECONE_REGION = os.getenv("PINECONE_REGION", "us-west-2")
 # Legacy environment var (v2 SDK) is not used by v3
 PINECONE_ENVIRONMENT = os.getenv("PINECONE_ENVIRONMENT")
 DATABASE_URL = os.getenv("DATABASE_URL")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY") 
\ No newline at end of file
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
+# Start Pinecone retrieval + introspection concurrently with supervisor routing
+SPECULATIVE_RETRIEVAL = os.getenv("SPECULATIVE_RETRIEVAL", "false").lower() in ("1", "true", "yes")
+
+# Upper bound (and default) for concurrently answered questions in one /ask/batch call
+ASK_BATCH_PARALLELISM = int(os.getenv("ASK_BATCH_PARALLELISM", "4"))
+
+# Local keyword router in front of the supervisor LLM (see app/ai/fast_router.py)
+FAST_ROUTER_ENABLED = os.getenv("FAST_ROUTER_ENABLED", "true").lower() in ("1", "true", "yes")
+FAST_ROUTER_MIN_CONFIDENCE = float(os.getenv("FAST_ROUTER_MIN_CONFIDENCE", "0.8"))
+
+# Answer cache (see app/core/answer_cache.py): memory | sqlite | off
+ANSWER_CACHE_BACKEND = os.getenv("ANSWER_CACHE_BACKEND", "memory").lower()
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", ".cache/answers.sqlite3")
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+# How often the live schema fingerprint that versions cache keys is re-read
+SCHEMA_FINGERPRINT_TTL_SECONDS = float(os.getenv("SCHEMA_FINGERPRINT_TTL_SECONDS", "60"))
+
+# Schema of every table loaded in bulk at startup and served from memory (see app/ai/tools/schema_catalog.py)
+SCHEMA_CATALOG_ENABLED = os.getenv("SCHEMA_CATALOG_ENABLED", "true").lower() in ("1", "true", "yes")
+# Catalog compiled from the SQLAlchemy models by scripts/build_schema_catalog.py, served until the live load finishes
+SCHEMA_CATALOG_PATH = os.getenv(
+    "SCHEMA_CATALOG_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ai", "schema", "catalog.json")
+)
+# Per-table schema versions re-read in the background; changed tables are invalidated in
+# every schema-dependent cache (see app/core/schema_versions.py). 0 disables polling
+SCHEMA_VERSION_POLL_SECONDS = float(os.getenv("SCHEMA_VERSION_POLL_SECONDS", "30"))
+
+# Question-aware pruning of the live schema section of the SQL prompt (see app/ai/tools/column_relevance.py):
+# keys plus at most this many typed columns per table (0: no per-table limit), within an estimated token budget
+# over all tables (0: none); either limit applies alone, both 0 lists every column. Up to as many more are named
+# without types, within the same budget
+SCHEMA_CONTEXT_MAX_COLUMNS = int(os.getenv("SCHEMA_CONTEXT_MAX_COLUMNS", "20"))
+SCHEMA_CONTEXT_TOKEN_BUDGET = int(os.getenv("SCHEMA_CONTEXT_TOKEN_BUDGET", "1500"))
+
+# Parameterized SQL templates reused for questions of the same shape (see app/ai/sql_templates.py)
+SQL_TEMPLATES_ENABLED = os.getenv("SQL_TEMPLATES_ENABLED", "true").lower() in ("1", "true", "yes")
+SQL_TEMPLATES_MAX_ENTRIES = int(os.getenv("SQL_TEMPLATES_MAX_ENTRIES", "500"))
+
+# Per-query result budget for generated SQL; whichever is hit first truncates the result
+SQL_MAX_ROWS = int(os.getenv("SQL_MAX_ROWS", "1000"))
+SQL_MAX_RESULT_BYTES = int(os.getenv("SQL_MAX_RESULT_BYTES", str(5 * 1024 * 1024)))
+
+# Read-only engine for generated SQL (see app/core/database.py analytics_engine)
+SQL_STATEMENT_TIMEOUT_MS = int(os.getenv("SQL_STATEMENT_TIMEOUT_MS", "10000"))
+ANALYTICS_POOL_SIZE = int(os.getenv("ANALYTICS_POOL_SIZE", "10"))
+ANALYTICS_MAX_OVERFLOW = int(os.getenv("ANALYTICS_MAX_OVERFLOW", "20"))
+ANALYTICS_POOL_TIMEOUT_SECONDS = float(os.getenv("ANALYTICS_POOL_TIMEOUT_SECONDS", "10"))
+ANALYTICS_POOL_RECYCLE_SECONDS = int(os.getenv("ANALYTICS_POOL_RECYCLE_SECONDS", "1800"))
+
+# Read replicas for generated SQL and introspection (comma-separated URLs; empty = primary only)
+DATABASE_REPLICA_URLS = [u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
+# round_robin | least_connections
+REPLICA_BALANCING = os.getenv("REPLICA_BALANCING", "least_connections").lower()
+# Replicas lagging more than this (or unreachable) are skipped; the primary serves when none qualify
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "30"))
+REPLICA_LAG_CHECK_SECONDS = float(os.getenv("REPLICA_LAG_CHECK_SECONDS", "5"))
+
+# EXPLAIN-based cost gate for generated SQL (see app/ai/tools/sql_cost_gate.py)
+SQL_COST_GATE_ENABLED = os.getenv("SQL_COST_GATE_ENABLED", "true").lower() in ("1", "true", "yes")
+SQL_MAX_PLAN_COST = float(os.getenv("SQL_MAX_PLAN_COST", "1000000"))
+SQL_MAX_PLAN_ROWS = float(os.getenv("SQL_MAX_PLAN_ROWS", "10000000"))
+# Window of the default date-range predicate added to over-budget queries
+SQL_DEFAULT_DATE_RANGE_DAYS = int(os.getenv("SQL_DEFAULT_DATE_RANGE_DAYS", "90"))
+
+# Generated queries slower than this are logged with their normalized fingerprint
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "2000"))
+
+# Result-set cache keyed by canonical SQL and binds (see app/core/result_cache.py)
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESULT_CACHE_TTL_SECONDS = float(os.getenv("RESULT_CACHE_TTL_SECONDS", "3600"))
+# How long a table's ingest watermark is trusted before the cache re-reads it
+RESULT_CACHE_WATERMARK_TTL_SECONDS = float(os.getenv("RESULT_CACHE_WATERMARK_TTL_SECONDS", "5"))
+
+# How NUMERIC/DECIMAL values are returned from generated SQL and encoded in JSON responses:
+# "float" (JSON numbers) or "string" (exact decimal text)
+DECIMAL_ENCODING = os.getenv("DECIMAL_ENCODING", "float").lower()
+
+# Continuation tokens for truncated results (see app/core/result_cursor.py). Tokens are
+# signed with RESULT_CURSOR_SECRET; set it so tokens work across workers and restarts
+RESULT_CURSORS_ENABLED = os.getenv("RESULT_CURSORS_ENABLED", "true").lower() in ("1", "true", "yes")
+RESULT_CURSOR_SECRET = os.getenv("RESULT_CURSOR_SECRET") or secrets.token_hex(32)
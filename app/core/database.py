@@ -1,13 +1,226 @@
-from sqlalchemy import create_engine
+import asyncio
+import itertools
+import logging
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+from psycopg.types.numeric import FloatLoader
+from psycopg.types.string import TextLoader
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from app.core.config import DATABASE_URL
+from app.core.config import (
+    ANALYTICS_MAX_OVERFLOW,
+    ANALYTICS_POOL_RECYCLE_SECONDS,
+    ANALYTICS_POOL_SIZE,
+    ANALYTICS_POOL_TIMEOUT_SECONDS,
+    DATABASE_REPLICA_URLS,
+    DATABASE_URL,
+    DECIMAL_ENCODING,
+    REPLICA_BALANCING,
+    REPLICA_LAG_CHECK_SECONDS,
+    REPLICA_MAX_LAG_SECONDS,
+    SQL_STATEMENT_TIMEOUT_MS,
+)
+from app.core import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_database_url(url: str) -> str:
+    """Force the psycopg (v3) driver, which serves both the sync and asyncio engines."""
+    if not url:
+        return url
+    for prefix in ("postgres://", "postgresql://", "postgresql+psycopg2://"):
+        if url.startswith(prefix):
+            return "postgresql+psycopg://" + url[len(prefix):]
+    return url
+
+
+DATABASE_URL = normalize_database_url(DATABASE_URL)
 
 engine = create_engine(DATABASE_URL, pool_pre_ping=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Asyncio engine for the /ask request path; waits on Postgres do not hold a worker thread
+async_engine = create_async_engine(DATABASE_URL, pool_pre_ping=True)
+metrics.DB_POOL_CHECKED_OUT.labels("async").set_function(lambda: async_engine.pool.checkedout())
+
+# Engines for LLM-generated SQL. Session defaults are applied once per connection via
+# libpq startup options, so a query needs no SET round trips: every transaction is
+# read-only and REPEATABLE READ, and statements time out server-side.
+# Instead of pre-ping (a round trip per checkout), liveness relies on TCP keepalives,
+# pool_recycle and a single retry when a dropped connection fails on first use
+# (BusinessSQLAgent.aexecute_sql); SQLAlchemy then invalidates the rest of the pool.
+def create_analytics_engine(url: str) -> AsyncEngine:
+    analytics = create_async_engine(
+        url,
+        pool_size=ANALYTICS_POOL_SIZE,
+        max_overflow=ANALYTICS_MAX_OVERFLOW,
+        pool_timeout=ANALYTICS_POOL_TIMEOUT_SECONDS,
+        pool_recycle=ANALYTICS_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=False,
+        pool_use_lifo=True,
+        connect_args={
+            "options": (
+                "-c default_transaction_read_only=on"
+                " -c default_transaction_isolation=repeatable\\ read"
+                f" -c statement_timeout={SQL_STATEMENT_TIMEOUT_MS}"
+            ),
+            "keepalives": 1,
+            "keepalives_idle": 30,
+            "keepalives_interval": 10,
+            "keepalives_count": 3,
+        },
+    )
+
+    @event.listens_for(analytics.sync_engine, "connect")
+    def load_numeric(dbapi_connection, connection_record) -> None:
+        # NUMERIC arrives as float or str (DECIMAL_ENCODING) instead of Decimal, so result
+        # rows need no per-value conversion when encoded as JSON (app/core/fast_json.py)
+        loader = TextLoader if DECIMAL_ENCODING == "string" else FloatLoader
+        connection_record.driver_connection.adapters.register_loader("numeric", loader)
+
+    return analytics
+
+
+analytics_engine = create_analytics_engine(DATABASE_URL)
+metrics.DB_POOL_CHECKED_OUT.labels("analytics").set_function(lambda: analytics_engine.pool.checkedout())
+
+
+@asynccontextmanager
+async def async_connect(bind: AsyncEngine = async_engine, label: str = "async") -> AsyncIterator[AsyncConnection]:
+    """Check out a pooled async connection, recording the checkout wait under `label`."""
+    start = time.perf_counter()
+    async with bind.connect() as conn:
+        metrics.DB_POOL_WAIT_SECONDS.labels(label).observe(time.perf_counter() - start)
+        yield conn
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+
+# Read-replica routing for generated SQL and schema introspection.
+# Writes (ingest jobs) stay on the primary; answer- and result-cache freshness checks read
+# watermarks through the router too (WatermarkProbe in app/core/result_cache.py).
+
+# Lag is 0 when the replica has replayed everything it received, so an idle primary
+# (no new WAL, old replay timestamp) does not look like lag
+_REPLICA_LAG_SQL = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+    """
+)
+
+
+class Replica:
+    def __init__(self, label: str, engine: AsyncEngine):
+        self.label = label
+        self.engine = engine
+        # None until the first lag check; replicas are only used once checked
+        self.lag_seconds: Optional[float] = None
+        self.healthy = False
+
+    def checked_out(self) -> int:
+        return self.engine.pool.checkedout()
+
+    def status(self) -> Dict[str, Any]:
+        return {"replica": self.label, "healthy": self.healthy, "lag_seconds": self.lag_seconds, "checked_out": self.checked_out()}
+
+
+class ReplicaRouter:
+    """Pick a read replica per connection: lag-aware, round-robin or least-connections, primary fallback.
+
+    Lag is re-checked in the background at most every lag_check_seconds, so routing
+    itself never waits on a probe. A replica that fails to connect is marked unhealthy
+    until the next successful check.
+    """
+
+    def __init__(
+        self,
+        primary: AsyncEngine,
+        replica_urls: List[str],
+        balancing: str = "least_connections",
+        max_lag_seconds: float = 30.0,
+        lag_check_seconds: float = 5.0,
+    ):
+        self.primary = primary
+        self.replicas = [
+            Replica(f"replica-{i}", create_analytics_engine(normalize_database_url(url))) for i, url in enumerate(replica_urls)
+        ]
+        self.balancing = balancing
+        self.max_lag_seconds = max_lag_seconds
+        self.lag_check_seconds = lag_check_seconds
+        self._next = itertools.count()
+        self._checked_at = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+        for replica in self.replicas:
+            metrics.DB_POOL_CHECKED_OUT.labels(replica.label).set_function(replica.checked_out)
+
+    async def refresh(self) -> None:
+        """Re-check the lag of every replica (concurrently)."""
+        self._checked_at = time.monotonic()
+
+        async def check(replica: Replica) -> None:
+            try:
+                async with replica.engine.connect() as conn:
+                    lag = float((await conn.execute(_REPLICA_LAG_SQL)).scalar() or 0)
+                    await conn.rollback()
+                replica.lag_seconds, replica.healthy = lag, True
+            except Exception as e:
+                logger.warning(f"Replica {replica.label} lag check failed: {e}")
+                replica.lag_seconds, replica.healthy = None, False
+            metrics.DB_REPLICA_LAG_SECONDS.labels(replica.label).set(-1 if replica.lag_seconds is None else replica.lag_seconds)
+
+        await asyncio.gather(*(check(r) for r in self.replicas))
+
+    def _maybe_refresh(self) -> None:
+        if not self.replicas or time.monotonic() - self._checked_at < self.lag_check_seconds:
+            return
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.ensure_future(self.refresh())
+
+    def choose(self) -> Optional[Replica]:
+        """The replica to use now, or None for the primary."""
+        self._maybe_refresh()
+        eligible = [
+            r for r in self.replicas
+            if r.healthy and r.lag_seconds is not None and r.lag_seconds <= self.max_lag_seconds
+        ]
+        if not eligible:
+            return None
+        if self.balancing == "round_robin":
+            return eligible[next(self._next) % len(eligible)]
+        return min(eligible, key=lambda r: (r.checked_out(), r.lag_seconds))
+
+    @asynccontextmanager
+    async def connect(self) -> AsyncIterator[AsyncConnection]:
+        replica = self.choose()
+        async with AsyncExitStack() as stack:
+            conn = None
+            if replica is not None:
+                try:
+                    conn = await stack.enter_async_context(async_connect(replica.engine, replica.label))
+                except DBAPIError as e:
+                    logger.warning(f"Replica {replica.label} unavailable, using primary: {e}")
+                    replica.healthy = False
+            if conn is None:
+                conn = await stack.enter_async_context(async_connect(self.primary, "analytics"))
+            yield conn
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [r.status() for r in self.replicas]
+
+
+replica_router = ReplicaRouter(
+    analytics_engine, DATABASE_REPLICA_URLS, REPLICA_BALANCING, REPLICA_MAX_LAG_SECONDS, REPLICA_LAG_CHECK_SECONDS
+)
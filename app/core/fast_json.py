@@ -0,0 +1,40 @@
+"""orjson-based JSON encoding for API responses.
+
+FastAPI's default path runs jsonable_encoder over the returned dict, walking every
+row value in Python before json.dumps walks it again. orjson encodes str, int,
+float, bool, None, dict, list, date, time and datetime (RFC 3339, same text as
+isoformat()) natively in one pass.
+
+NUMERIC columns are turned into float or str (DECIMAL_ENCODING) by psycopg's loaders
+on the analytics connections (see app/core/database.py), so result rows carry no
+Decimal values; any that reach the encoder from elsewhere go through the default
+hook below with the same setting.
+"""
+import decimal
+from typing import Any
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.core.config import DECIMAL_ENCODING
+
+OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, decimal.Decimal):
+        return str(value) if DECIMAL_ENCODING == "string" else float(value)
+    # Pydantic models, sets, enums, UUIDs, ...
+    return jsonable_encoder(value)
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson; return it from the endpoint so FastAPI skips jsonable_encoder."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,113 @@
+"""Data-freshness watermarks and schema fingerprints for the answer cache.
+
+Every ingested Amazon/supply-chain table carries `job_execution_id` and
+`job_chunk_fetched_at`. The watermark of a table is the pair
+(max(job_execution_id), max(job_chunk_fetched_at)); it changes whenever an ingest
+job lands new rows. An answer is only reusable while the watermark of every table
+its SQL read is unchanged, so answers reading tables without these columns are
+never cached. The tables have no index on these columns, so reading a watermark
+scans the table: callers go through result_cache.WatermarkProbe, which caches it per
+table for a few seconds and reads it on a replica.
+"""
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.core import sql_analysis
+from app.core.database import async_connect
+
+WATERMARK_COLUMNS = ("job_execution_id", "job_chunk_fetched_at")
+
+# Fallback for SQL the parser rejects: candidate names after FROM/JOIN; names that do
+# not resolve to a relation (CTE names, EXTRACT(... FROM col)) are dropped when probing
+_RELATION = re.compile(r"\b(?:from|join)\s+((?:\"?[A-Za-z_][\w$]*\"?\.)?\"?[A-Za-z_][\w$]*\"?)", re.IGNORECASE)
+
+# Resolve names against the connection's search_path; returns the schema-qualified
+# name and how many watermark columns the relation has
+_RESOLVE_SQL = text(
+    """
+    SELECT t.name,
+           quote_ident(n.nspname) || '.' || quote_ident(c.relname) AS qualified,
+           count(a.attname) AS watermark_columns
+    FROM unnest(CAST(:names AS text[])) AS t(name)
+    JOIN pg_class c ON c.oid = to_regclass(t.name)
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN pg_attribute a
+      ON a.attrelid = c.oid AND a.attname = ANY(CAST(:columns AS text[])) AND NOT a.attisdropped
+    GROUP BY t.name, n.nspname, c.relname
+    """
+)
+
+_FINGERPRINT_SQL = text(
+    """
+    SELECT md5(coalesce(string_agg(
+        table_schema || '.' || table_name || '.' || column_name || ':' || data_type, ','
+        ORDER BY table_schema, table_name, ordinal_position), ''))
+    FROM information_schema.columns
+    WHERE table_schema NOT IN ('pg_catalog', 'information_schema')
+    """
+)
+
+
+def referenced_relations(sql: str) -> List[str]:
+    """Tables a query reads (CTE names excluded), in order of first appearance."""
+    analysis = sql_analysis.analyze(sql)
+    if analysis.error is None and analysis.parsed:
+        return analysis.tables
+    names: List[str] = []
+    for match in _RELATION.finditer(sql or ""):
+        name = match.group(1)
+        if name not in names:
+            names.append(name)
+    return names
+
+
+async def probe_watermark(conn: AsyncConnection, sql: str) -> Optional[Dict[str, List[Any]]]:
+    """Watermark of every table the query reads, or None when any of them is not an ingested table.
+
+    Run inside the transaction that executed the query so both see the same snapshot.
+    """
+    names = referenced_relations(sql)
+    if not names:
+        return {}
+    resolved = (await conn.execute(_RESOLVE_SQL, {"names": names, "columns": list(WATERMARK_COLUMNS)})).all()
+    if any(row.watermark_columns < len(WATERMARK_COLUMNS) for row in resolved):
+        return None
+    return await read_watermark(conn, sorted({row.qualified for row in resolved}))
+
+
+async def read_watermark(conn: AsyncConnection, tables: List[str]) -> Dict[str, List[Any]]:
+    """Current watermark for schema-qualified table names (as returned by probe_watermark)."""
+    if not tables:
+        return {}
+    # Names come from quote_ident() in _RESOLVE_SQL, never from the question or the LLM
+    selects = [
+        f"SELECT CAST(:t{i} AS text) AS tbl, max(job_execution_id) AS job_execution_id, max(job_chunk_fetched_at) AS fetched_at FROM {t}"
+        for i, t in enumerate(tables)
+    ]
+    params = {f"t{i}": t for i, t in enumerate(tables)}
+    rows = (await conn.execute(text(" UNION ALL ".join(selects)), params)).all()
+    return {
+        row.tbl: [row.job_execution_id, row.fetched_at.isoformat() if row.fetched_at is not None else None]
+        for row in rows
+    }
+
+
+class SchemaFingerprint:
+    """md5 over information_schema.columns, re-read at most every ttl_seconds."""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._value: Optional[str] = None
+        self._expires = 0.0
+
+    async def get(self) -> str:
+        now = time.monotonic()
+        if self._value is None or now >= self._expires:
+            async with async_connect() as conn:
+                self._value = (await conn.execute(_FINGERPRINT_SQL)).scalar_one()
+            self._expires = now + self.ttl_seconds
+        return self._value
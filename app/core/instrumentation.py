@@ -0,0 +1,120 @@
+"""Structured per-node timing spans.
+
+Each graph node runs inside a span (see `instrumented`). Code called from the node
+(LLM calls, Pinecone, introspection, SQL) adds measurements to the current span
+through `record_llm_usage`, `timed` and `add`, found via a context variable, so
+agents and tools do not need to pass a span around. Finished spans are returned to
+the client under `timings`, aggregated in-process by `TimingStats` and exported
+to Prometheus via app/core/metrics.py.
+"""
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional
+from app.core import metrics
+
+Span = Dict[str, Any]
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class TimingStats:
+    """Process-wide aggregate of finished spans: count, totals and max wall time per node."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._nodes: Dict[str, Dict[str, float]] = {}
+
+    def observe(self, span: Span) -> None:
+        with self._lock:
+            agg = self._nodes.setdefault(span["node"], {"count": 0, "max_wall_ms": 0.0})
+            agg["count"] += 1
+            agg["max_wall_ms"] = max(agg["max_wall_ms"], span.get("wall_ms") or 0.0)
+            for key, value in span.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    agg[f"total_{key}"] = agg.get(f"total_{key}", 0) + value
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            out = {}
+            for node, agg in self._nodes.items():
+                out[node] = {k: round(v, 2) if isinstance(v, float) else v for k, v in agg.items()}
+                out[node]["avg_wall_ms"] = round(agg.get("total_wall_ms", 0) / agg["count"], 2)
+            return out
+
+
+timing_stats = TimingStats()
+
+
+@contextmanager
+def span(node: str) -> Iterator[Span]:
+    record: Span = {"node": node}
+    token = _current_span.set(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["wall_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        _current_span.reset(token)
+        timing_stats.observe(record)
+        metrics.NODE_SECONDS.labels(node).observe(record["wall_ms"] / 1000)
+
+
+def instrumented(node: str) -> Callable:
+    """Decorate an async graph node so its update carries its span under `timings`."""
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs) -> Dict[str, Any]:
+            with span(node) as record:
+                update = await fn(*args, **kwargs)
+            return {**update, "timings": list(update.get("timings") or []) + [record]}
+        return wrapper
+    return decorator
+
+
+def add(**values: Any) -> None:
+    """Add numeric values to the current span (summed when a key repeats)."""
+    record = _current_span.get()
+    if record is None:
+        return
+    for key, value in values.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            record[key] = round(record.get(key, 0) + value, 2)
+        else:
+            record[key] = value
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """Time a block and add it to the current span as `<name>_ms`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        add(**{f"{name}_ms": elapsed * 1000})
+        metrics.STAGE_SECONDS.labels(name).observe(elapsed)
+
+
+def record_llm_usage(caller: str, message: Any, elapsed_ms: float) -> None:
+    """Record one LLM call (latency and token usage from the AIMessage) on the current span.
+
+    caller names the call site, e.g. "supervisor" or "BusinessSQLAgent.generate_sql".
+    """
+    usage = getattr(message, "usage_metadata", None) or {}
+    prompt_tokens = usage.get("input_tokens", 0)
+    completion_tokens = usage.get("output_tokens", 0)
+    add(
+        llm_caller=caller,
+        llm_calls=1,
+        llm_ms=elapsed_ms,
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+    )
+    metrics.LLM_CALLS.labels(caller).inc()
+    metrics.LLM_SECONDS.labels(caller).observe(elapsed_ms / 1000)
+    metrics.LLM_TOKENS.labels(caller, "prompt").inc(prompt_tokens)
+    metrics.LLM_TOKENS.labels(caller, "completion").inc(completion_tokens)
+
@@ -0,0 +1,45 @@
+"""Prometheus metrics for the /ask pipeline, exposed by app.main at /metrics.
+
+Node, stage and LLM metrics are fed by app/core/instrumentation.py, so anything
+recorded on a timing span is also visible here. Names are prefixed `erp_agent_`.
+"""
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Seconds; covers sub-millisecond cache hits up to the 10s statement timeout and slow LLM calls
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+NODE_SECONDS = Histogram(
+    "erp_agent_node_duration_seconds", "Wall time of each graph node", ["node"], buckets=LATENCY_BUCKETS
+)
+STAGE_SECONDS = Histogram(
+    "erp_agent_stage_duration_seconds", "Latency of pipeline stages inside nodes (pinecone, introspection, ...)",
+    ["stage"], buckets=LATENCY_BUCKETS,
+)
+LLM_CALLS = Counter("erp_agent_llm_calls_total", "LLM calls by caller", ["caller"])
+LLM_TOKENS = Counter("erp_agent_llm_tokens_total", "LLM tokens by caller and kind (prompt|completion)", ["caller", "kind"])
+LLM_SECONDS = Histogram("erp_agent_llm_duration_seconds", "LLM call latency by caller", ["caller"], buckets=LATENCY_BUCKETS)
+SQL_SECONDS = Histogram("erp_agent_sql_duration_seconds", "Generated SQL execution time (execute + fetch)", buckets=LATENCY_BUCKETS)
+SQL_ROWS = Histogram(
+    "erp_agent_sql_rows_returned", "Rows returned per generated query", buckets=(0, 1, 10, 50, 100, 200, 500, 1000, 5000)
+)
+FAST_ROUTER_SAVED_SECONDS = Counter(
+    "erp_agent_fast_router_saved_seconds_total", "Estimated supervisor LLM latency avoided by fast-path routing"
+)
+CACHE_REQUESTS = Counter("erp_agent_cache_requests_total", "Cache lookups by cache name and result (hit|miss)", ["cache", "result"])
+DB_POOL_WAIT_SECONDS = Histogram(
+    "erp_agent_db_pool_checkout_wait_seconds", "Time to obtain a pooled DB connection", ["engine"], buckets=LATENCY_BUCKETS
+)
+DB_REPLICA_LAG_SECONDS = Gauge("erp_agent_db_replica_lag_seconds", "Replay lag of each read replica (-1 when unreachable)", ["replica"])
+DB_POOL_CHECKED_OUT = Gauge("erp_agent_db_pool_checked_out", "Connections currently checked out of the pool", ["engine"])
+REQUESTS_CANCELLED = Counter(
+    "erp_agent_requests_cancelled_total", "Requests abandoned by the client and cancelled before answering", ["endpoint"]
+)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def render_latest() -> tuple:
+    """Return (body, content_type) for the Prometheus text exposition format."""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,182 @@
+"""Result-set cache between BusinessSQLAgent.aexecute_sql and Postgres.
+
+Different phrasings of a question often produce the same SQL. Entries are keyed by
+the canonical form of the query (app/core/sql_analysis.py: formatting-insensitive,
+literals kept) and its binds, and hold the rows in a compact columnar form: column
+names once, one value tuple per column, pickled and zlib-compressed. Values keep their
+Python types (date, datetime, ...), so a hit returns exactly what psycopg did.
+
+An entry records the ingest watermark (app/core/freshness.py) of every table the query
+read, in the query's own snapshot. A hit requires every watermark to be unchanged;
+the current watermarks come from WatermarkProbe, which caches them per table for a
+few seconds so a burst of hits costs one max() scan per table. Queries reading a
+table without watermark columns, or calling volatile functions (random(), ...), are
+not cached; entries for time-relative queries (current_date, now(), or a cost-gate
+date-range rewrite) only hit on the UTC day they were stored. Entries reading a table
+whose schema changed are dropped by invalidate() (see app/core/schema_versions.py).
+"""
+import datetime
+import hashlib
+import json
+import logging
+import pickle
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.core import freshness
+from app.core.database import replica_router
+
+logger = logging.getLogger(__name__)
+
+
+def encode_rows(rows: List[Dict[str, Any]]) -> bytes:
+    columns = list(rows[0]) if rows else []
+    data = [tuple(row.get(c) for row in rows) for c in columns]
+    return zlib.compress(pickle.dumps((columns, len(rows), data), protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def decode_rows(blob: bytes) -> List[Dict[str, Any]]:
+    columns, count, data = pickle.loads(zlib.decompress(blob))
+    if not columns:
+        return [{} for _ in range(count)]
+    return [dict(zip(columns, values)) for values in zip(*data)]
+
+
+def utc_today() -> str:
+    """Day stamp of entries whose rows depend on the date they were read (current_date, date-range rewrites)."""
+    return datetime.datetime.now(datetime.timezone.utc).date().isoformat()
+
+
+class WatermarkProbe:
+    """Current per-table watermarks, re-read from the database at most every ttl_seconds."""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._values: Dict[str, Tuple[float, List[Any]]] = {}
+        self._lock = threading.Lock()
+
+    async def get(self, tables: List[str]) -> Dict[str, List[Any]]:
+        now = time.monotonic()
+        current: Dict[str, List[Any]] = {}
+        with self._lock:
+            for table in tables:
+                item = self._values.get(table)
+                if item is not None and now < item[0]:
+                    current[table] = item[1]
+        missing = [t for t in tables if t not in current]
+        if missing:
+            async with replica_router.connect() as conn:
+                fresh = await freshness.read_watermark(conn, missing)
+            self.update(fresh)
+            current.update(fresh)
+        return current
+
+    def update(self, watermark: Dict[str, List[Any]]) -> None:
+        """Record watermarks just read elsewhere (e.g. in a query's own transaction)."""
+        expires = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            for table, value in watermark.items():
+                self._values[table] = (expires, value)
+
+
+class ResultCache:
+    """LRU over compressed entries, bounded by total compressed size; entries also expire after ttl_seconds."""
+
+    def __init__(self, max_bytes: int, ttl_seconds: float, watermark_ttl_seconds: float):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.watermarks = WatermarkProbe(watermark_ttl_seconds)
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(canonical_sql: str, params: Optional[Dict[str, Any]], page: Optional[Dict[str, Any]] = None) -> str:
+        binds = json.dumps(params or {}, sort_keys=True, default=str)
+        # Continuation pages of the same query differ by their keyset position
+        position = json.dumps([page["keys"], page["after"]], default=str) if page else ""
+        return hashlib.sha256(f"{canonical_sql}\x1f{binds}\x1f{position}".encode()).hexdigest()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return {rows, truncated, plan, cursor, watermark} for a fresh entry, else None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None:
+            return None
+        stale = time.monotonic() >= entry["expires"] or entry["day"] not in (None, utc_today())
+        if not stale:
+            current = await self.watermarks.get(sorted(entry["watermark"]))
+            stale = current != entry["watermark"]
+            if stale:
+                logger.debug(f"Result cache entry outdated by ingest: {entry['watermark']} -> {current}")
+        if stale:
+            self.delete(key)
+            return None
+        return {
+            "rows": decode_rows(entry["blob"]),
+            "truncated": entry["truncated"],
+            "plan": entry["plan"],
+            "cursor": entry["cursor"],
+            "watermark": entry["watermark"],
+        }
+
+    def put(
+        self,
+        key: str,
+        rows: List[Dict[str, Any]],
+        truncated: bool,
+        plan: Optional[Dict[str, Any]],
+        cursor: Optional[Dict[str, Any]],
+        watermark: Optional[Dict[str, List[Any]]],
+        time_dependent: bool,
+    ) -> bool:
+        """Store a result read in the same snapshot as watermark; False when it is not cacheable."""
+        if not watermark:
+            # None: a table without watermark columns; {}: no tables, nothing to validate against
+            return False
+        self.watermarks.update(watermark)
+        blob = encode_rows(rows)
+        if len(blob) > self.max_bytes:
+            return False
+        entry = {
+            "blob": blob,
+            "truncated": truncated,
+            "plan": plan,
+            "cursor": cursor,
+            "watermark": watermark,
+            "expires": time.monotonic() + self.ttl_seconds,
+            "day": utc_today() if time_dependent or (plan or {}).get("rewrites") else None,
+        }
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old["blob"])
+            self._entries[key] = entry
+            self._bytes += len(blob)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted["blob"])
+        return True
+
+    def invalidate(self, relations: Set[str]) -> int:
+        """Drop entries reading any of these tables (quote_ident-qualified, like watermark keys)."""
+        with self._lock:
+            stale = [k for k, e in self._entries.items() if not relations.isdisjoint(e["watermark"])]
+            for key in stale:
+                self._bytes -= len(self._entries.pop(key)["blob"])
+        return len(stale)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= len(entry["blob"])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
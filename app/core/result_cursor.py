@@ -0,0 +1,203 @@
+"""Keyset continuation for generated queries whose result hit the row/byte budget.
+
+plan_keyset() picks a sort key for a query before it runs: the query's own ORDER BY
+(resolved to output column names) followed by a unique tiebreaker (its GROUP BY or
+DISTINCT columns, or the primary key of its single table). The first page is read in
+that order, and when it is truncated the caller gets a continuation cursor holding
+the SQL as executed, its binds, the sort key and the last row's key values. The next
+page runs the same SQL (no new LLM call) with a seek predicate on those values
+instead of an OFFSET, so each page costs the same regardless of depth.
+
+Cursors travel to clients as signed tokens (encode_cursor/decode_cursor): the SQL
+inside is checked against RESULT_CURSOR_SECRET rather than trusted. Tokens do not
+expire (replaying one re-runs a query that was already allowed), but the default
+secret is per process: set it explicitly so tokens survive restarts and work on
+every worker.
+"""
+import base64
+import binascii
+import hashlib
+import hmac
+import zlib
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import orjson
+import sqlglot
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlglot import exp
+from sqlglot.errors import ParseError
+
+from app.core.config import RESULT_CURSOR_SECRET
+from app.core.fast_json import dumps
+
+_PRIMARY_KEY_SQL = text(
+    """
+    SELECT a.attname
+    FROM pg_index i
+    JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+    WHERE i.indrelid = to_regclass(:relation) AND i.indisprimary
+    ORDER BY array_position(CAST(i.indkey AS int2[]), a.attnum)
+    """
+)
+
+
+class SortKey(NamedTuple):
+    column: str
+    desc: bool = False
+    # Postgres default: NULLS LAST ascending, NULLS FIRST descending
+    nulls_first: bool = False
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _identifier(identifier: exp.Identifier) -> str:
+    # Unquoted names fold to lower case
+    return identifier.name if identifier.quoted else identifier.name.lower()
+
+
+def _output_name(expression: exp.Expression) -> str:
+    """Column name Postgres gives this select-list item ("" when it cannot be told statically)."""
+    if isinstance(expression, exp.Alias):
+        return _identifier(expression.args["alias"])
+    if isinstance(expression, exp.Column):
+        return _identifier(expression.this)
+    return ""
+
+
+def _resolve(expression: exp.Expression, outputs: List[exp.Expression], star: bool) -> Optional[str]:
+    """Output column name that expression (from ORDER BY / GROUP BY) refers to, or None."""
+    if isinstance(expression, exp.Literal) and not expression.is_string:
+        position = int(expression.name)
+        if star or not 1 <= position <= len(outputs):
+            return None
+        # An unnamed expression ("sum(amount)") cannot be referenced from outside
+        return _output_name(outputs[position - 1]) or None
+    for output in outputs:
+        if output == expression or output.unalias() == expression:
+            return _output_name(output) or None
+    if isinstance(expression, exp.Column):
+        name = _output_name(expression)
+        if name and (star or name in {n for n in (_output_name(o) for o in outputs) if n}):
+            return name
+    return None
+
+
+async def plan_keyset(conn: AsyncConnection, sql: str, max_rows: int) -> Optional[List[SortKey]]:
+    """Sort key that orders sql's rows uniquely by output columns; None when no continuation is possible.
+
+    Also None when the query's own LIMIT keeps it within max_rows, since it can never be cut.
+    """
+    try:
+        tree = sqlglot.parse_one(sql, read="postgres")
+    except ParseError:
+        return None
+    if not isinstance(tree, exp.Select):
+        # UNION/INTERSECT/EXCEPT: no single ORDER BY scope to reason about
+        return None
+    limit = tree.args.get("limit")
+    if limit is not None:
+        value = limit.expression
+        if isinstance(value, exp.Literal) and not value.is_string and int(value.name) <= max_rows:
+            return None
+    outputs = tree.expressions
+    star = any(isinstance(o, exp.Star) or (isinstance(o, exp.Column) and isinstance(o.this, exp.Star)) for o in outputs)
+    joins = tree.args.get("joins")
+    # The FROM arg is "from_" in newer sqlglot releases
+    from_ = tree.args.get("from_") or tree.args.get("from")
+    source = from_.this if from_ is not None else None
+    names = [_output_name(o) for o in outputs if not star]
+    named = [n for n in names if n]
+    if len(named) != len(set(named)) or (star and joins):
+        # Duplicate output names cannot be referenced from the wrapping query
+        return None
+
+    keys: List[SortKey] = []
+    order = tree.args.get("order")
+    for ordered in order.expressions if order else []:
+        name = _resolve(ordered.this, outputs, star)
+        if name is None:
+            return None
+        keys.append(SortKey(name, bool(ordered.args.get("desc")), bool(ordered.args.get("nulls_first"))))
+
+    unique: Optional[List[str]] = None
+    group = tree.args.get("group")
+    if tree.args.get("distinct") and not star:
+        unique = None if "" in names else names
+    elif group:
+        resolved = [_resolve(g, outputs, star) for g in group.expressions]
+        unique = None if None in resolved else resolved
+    elif not joins and isinstance(source, exp.Table) and not (
+        not source.args.get("db") and source.name in {cte.alias_or_name for cte in tree.ctes}
+    ):
+        # A CTE is not the table to_regclass() would find under its name (if any): its
+        # rows have no primary key, so only DISTINCT/GROUP BY can make them unique
+        table = source
+        relation = exp.Table(this=table.this, db=table.args.get("db")).sql(dialect="postgres")
+        primary_key = [r[0] for r in (await conn.execute(_PRIMARY_KEY_SQL, {"relation": relation})).all()]
+        # Source column -> output name, for key columns selected under an alias
+        selected = {_output_name(o.unalias()): _output_name(o) for o in outputs if isinstance(o.unalias(), exp.Column)}
+        if primary_key and (star or all(c in selected for c in primary_key)):
+            unique = primary_key if star else [selected[c] for c in primary_key]
+    if not unique:
+        return None
+    ordered_columns = {k.column for k in keys}
+    keys.extend(SortKey(column) for column in unique if column not in ordered_columns)
+    return keys
+
+
+def order_by(keys: List[SortKey]) -> str:
+    return ", ".join(
+        f"{_quote(k.column)} {'DESC' if k.desc else 'ASC'} NULLS {'FIRST' if k.nulls_first else 'LAST'}" for k in keys
+    )
+
+
+def seek(keys: List[SortKey], after: List[Any]) -> Tuple[str, Dict[str, Any]]:
+    """WHERE clause selecting rows that sort after the row whose key values are `after`."""
+    params = {f"keyset_{i}": value for i, value in enumerate(after)}
+    branches = []
+    for i, key in enumerate(keys):
+        column = _quote(key.column)
+        if after[i] is None:
+            # Only non-null values can follow a NULL, and only when NULLs sort first
+            beyond = f"{column} IS NOT NULL" if key.nulls_first else None
+        else:
+            beyond = f"{column} {'<' if key.desc else '>'} :keyset_{i}"
+            if not key.nulls_first:
+                beyond = f"({beyond} OR {column} IS NULL)"
+        if beyond is not None:
+            equal = [f"{_quote(k.column)} IS NOT DISTINCT FROM :keyset_{j}" for j, k in enumerate(keys[:i])]
+            branches.append("(" + " AND ".join(equal + [beyond]) + ")")
+    return " OR ".join(branches) or "FALSE", params
+
+
+def cursor_after(keys: List[SortKey], row: Dict[str, Any]) -> List[Any]:
+    # JSON round trip: dates/datetimes become ISO strings, which Postgres reads back by column type
+    return orjson.loads(dumps([row.get(k.column) for k in keys]))
+
+
+def _sign(body: bytes) -> str:
+    digest = hmac.new(RESULT_CURSOR_SECRET.encode(), body, hashlib.sha256).digest()[:16]
+    return base64.urlsafe_b64encode(digest).decode().rstrip("=")
+
+
+def encode_cursor(cursor: Dict[str, Any]) -> str:
+    state = {**cursor, "keys": [list(k) for k in cursor["keys"]]}
+    body = base64.urlsafe_b64encode(zlib.compress(dumps(state))).decode().rstrip("=")
+    return f"{body}.{_sign(body.encode())}"
+
+
+def decode_cursor(token: str) -> Dict[str, Any]:
+    """Verify and unpack a continuation token; ValueError when it is malformed or forged."""
+    body, _, signature = (token or "").partition(".")
+    # As bytes: compare_digest() raises TypeError on non-ASCII str
+    if not body or not hmac.compare_digest(signature.encode(), _sign(body.encode()).encode()):
+        raise ValueError("Invalid continuation token")
+    try:
+        cursor = orjson.loads(zlib.decompress(base64.urlsafe_b64decode(body + "=" * (-len(body) % 4))))
+        cursor["keys"] = [SortKey(*k) for k in cursor["keys"]]
+    except (binascii.Error, zlib.error, orjson.JSONDecodeError, KeyError, TypeError) as e:
+        raise ValueError("Invalid continuation token") from e
+    return cursor
@@ -0,0 +1,128 @@
+"""Per-table schema versions, polled in the background, for targeted cache invalidation.
+
+One catalog query hashes, per table, everything the schema-dependent caches read:
+columns (name, format_type, nullability), primary/foreign keys, indexes, table and
+column comments, and view definitions. Tables are named as quote_ident() prints them
+("public.amzn_orders"), the same form freshness watermarks use.
+
+SchemaVersionProbe re-reads the hashes every poll_seconds and calls its listeners
+with the set of tables that were altered, created or dropped since the previous
+poll, so each cache can drop or re-read only those tables:
+- the schema catalog and the introspector (app/ai/tools/db_introspector.py)
+- SQL templates reading those tables (app/ai/sql_templates.py)
+- result and answer cache entries reading those tables
+"""
+import asyncio
+import hashlib
+import inspect
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Union
+
+from sqlalchemy import text
+
+from app.core.database import replica_router
+
+logger = logging.getLogger(__name__)
+
+_VERSIONS_SQL = text(
+    """
+    SELECT quote_ident(n.nspname) || '.' || quote_ident(c.relname) AS relation,
+           md5(concat_ws('|', c.oid, c.relkind, obj_description(c.oid, 'pg_class'),
+               (SELECT string_agg(concat_ws(':', a.attnum, a.attname, format_type(a.atttypid, a.atttypmod),
+                                            a.attnotnull, col_description(c.oid, a.attnum)), ',' ORDER BY a.attnum)
+                FROM pg_attribute a WHERE a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped),
+               (SELECT string_agg(concat_ws(':', con.conname, con.contype, con.conkey, con.confrelid, con.confkey), ','
+                                  ORDER BY con.conname)
+                FROM pg_constraint con WHERE con.conrelid = c.oid),
+               (SELECT string_agg(concat_ws(':', i.indexrelid, i.indkey, i.indisunique), ',' ORDER BY i.indexrelid)
+                FROM pg_index i WHERE i.indrelid = c.oid),
+               CASE WHEN c.relkind IN ('v', 'm') THEN md5(pg_get_viewdef(c.oid)) END)) AS version
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE c.relkind IN ('r', 'p', 'v', 'm', 'f') AND NOT c.relispartition
+      AND n.nspname NOT IN ('pg_catalog', 'information_schema') AND n.nspname NOT LIKE 'pg\\_%'
+    """
+)
+
+Listener = Callable[[Set[str]], Union[None, Awaitable[Any]]]
+
+
+class SchemaVersionProbe:
+    """Schema version of every table, re-read in the background every poll_seconds."""
+
+    def __init__(self, poll_seconds: float):
+        self.poll_seconds = poll_seconds
+        self.versions: Dict[str, str] = {}
+        self.version: Optional[str] = None
+        self.checked_at: Optional[float] = None
+        self.changes = 0
+        self._listeners: List[Listener] = []
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.checked_at is not None
+
+    def subscribe(self, listener: Listener) -> None:
+        """listener(tables) is called (and awaited when it returns an awaitable) after a change."""
+        self._listeners.append(listener)
+
+    def versions_for(self, tables: Iterable[str]) -> Optional[Dict[str, Optional[str]]]:
+        """Current versions of these quote_ident-qualified tables (None for unknown ones); None before the first check."""
+        if not self.loaded:
+            return None
+        return {t: self.versions.get(t) for t in sorted(set(tables))}
+
+    async def check(self) -> Set[str]:
+        """Re-read versions and notify listeners; returns the tables that changed (none on the first read)."""
+        async with replica_router.connect() as conn:
+            rows = (await conn.execute(_VERSIONS_SQL)).all()
+        versions = {row.relation: row.version for row in rows}
+        changed: Set[str] = set()
+        if self.loaded:
+            changed = {t for t in versions.keys() | self.versions.keys() if versions.get(t) != self.versions.get(t)}
+        self.versions = versions
+        self.version = hashlib.md5("".join(f"{t}={v};" for t, v in sorted(versions.items())).encode()).hexdigest()
+        self.checked_at = time.time()
+        if changed:
+            self.changes += 1
+            logger.info(f"Schema changed for {len(changed)} tables: {sorted(changed)}")
+            for listener in self._listeners:
+                try:
+                    result = listener(changed)
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception:
+                    logger.exception(f"Schema change listener {listener!r} failed")
+        return changed
+
+    async def _poll(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            try:
+                await self.check()
+            except Exception as e:
+                logger.warning(f"Schema version check failed: {e}")
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._poll())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tables": len(self.versions),
+            "version": self.version,
+            "checked_at": self.checked_at,
+            "changes": self.changes,
+            "poll_seconds": self.poll_seconds,
+        }
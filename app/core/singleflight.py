@@ -0,0 +1,50 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one execution.
+
+    The first caller for a key starts the work as a task; callers arriving while it
+    is in flight await the same task and receive the same result (or exception).
+    The key is released as soon as the task finishes, so later calls run fresh.
+    Waiters await through asyncio.shield, so a cancelled caller does not cancel the
+    execution the other callers depend on; when the last waiter of a key is cancelled
+    (e.g. every client asking it disconnected), the key is released and the execution
+    is cancelled too.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._waiters: Dict[asyncio.Task, int] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """Run fn() once per in-flight key; returns (result, shared) where shared means coalesced."""
+        task = self._inflight.get(key)
+        shared = task is not None
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._release(key, t))
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task), shared
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+                if not task.done():
+                    # Nobody is left to receive the result. Release the key first: cancelling
+                    # (LLM abort, PG cancel) takes a round trip, and a caller arriving
+                    # meanwhile must start a fresh run rather than join this one
+                    self._release(key, task)
+                    task.cancel()
+
+    def _release(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    def __len__(self) -> int:
+        return len(self._inflight)
@@ -0,0 +1,151 @@
+"""Parse-tree validation and fingerprinting of generated SQL (sqlglot, Postgres dialect).
+
+analyze() enforces a single read-only SELECT/WITH statement on the parsed tree, so
+identifiers such as `update_date` or string literals containing `;` or `drop` are
+no longer rejected. It also returns the referenced tables and columns, and a
+fingerprint of the normalized query with literals replaced by placeholders, so repeated
+queries that differ only in values share one key (metrics, slow-query log), and a
+canonical form that keeps the literals (result cache key).
+"""
+import hashlib
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import sqlglot
+from sqlglot import exp
+from sqlglot.dialects.postgres import Postgres
+from sqlglot.errors import ParseError, TokenError
+from sqlglot.tokens import TokenType
+
+# Nodes that write, lock or change the session/database, wherever they appear in the tree
+FORBIDDEN_NODES = (
+    exp.Insert, exp.Update, exp.Delete, exp.Merge, exp.Create, exp.Drop, exp.Alter,
+    exp.TruncateTable, exp.Command, exp.Into, exp.Lock, exp.Set, exp.Transaction,
+)
+# Functions that act on the server even inside a read-only transaction
+FORBIDDEN_FUNCTIONS = {
+    "pg_terminate_backend", "pg_cancel_backend", "pg_reload_conf", "pg_rotate_logfile", "set_config",
+    "pg_read_file", "pg_read_binary_file", "pg_ls_dir", "pg_stat_file", "lo_import", "lo_export",
+    "dblink", "dblink_exec", "pg_advisory_lock", "pg_advisory_xact_lock", "pg_sleep",
+}
+# Functions whose result depends on the time the query runs
+TIME_FUNCTIONS = {
+    "current_date", "current_timestamp", "current_time", "localtimestamp", "localtime", "now",
+    "transaction_timestamp", "age",
+}
+# Functions whose result differs between two runs of the same query on the same data
+VOLATILE_FUNCTIONS = {
+    "rand", "random", "setseed", "clock_timestamp", "statement_timestamp", "timeofday", "gen_random_uuid",
+    "uuid_generate_v4", "nextval", "currval", "txid_current", "pg_current_xact_id",
+}
+# Token-level equivalent of FORBIDDEN_NODES, for SQL the parser does not support
+FORBIDDEN_TOKENS = {
+    TokenType.INSERT, TokenType.UPDATE, TokenType.DELETE, TokenType.MERGE, TokenType.CREATE, TokenType.DROP,
+    TokenType.ALTER, TokenType.TRUNCATE, TokenType.COMMAND, TokenType.INTO, TokenType.LOCK, TokenType.SET,
+    TokenType.GRANT, TokenType.COPY, TokenType.EXECUTE,
+}
+
+
+@dataclass
+class SQLAnalysis:
+    sql: str
+    # Reason the statement is not allowed; None when it is a single read-only query
+    error: Optional[str] = None
+    tables: List[str] = field(default_factory=list)
+    columns: List[str] = field(default_factory=list)
+    normalized: str = ""
+    fingerprint: str = ""
+    # Normalized query with its literals kept; equal for queries that differ only in formatting
+    canonical: str = ""
+    # Calls TIME_FUNCTIONS (the result moves with the clock) / VOLATILE_FUNCTIONS (never reproducible)
+    time_dependent: bool = False
+    volatile: bool = False
+    # False when only the tokenizer fallback ran; tables/columns are then unknown (empty)
+    parsed: bool = True
+
+
+def _fingerprint(normalized: str) -> str:
+    return hashlib.sha1(normalized.encode()).hexdigest()[:16]
+
+
+def analyze(sql: str) -> SQLAnalysis:
+    try:
+        statements = [s for s in sqlglot.parse(sql, read="postgres") if s is not None]
+    except ParseError:
+        return _analyze_tokens(sql)
+    except TokenError as e:
+        return SQLAnalysis(sql, error=f"SQL could not be parsed: {e}", parsed=False)
+    if len(statements) > 1:
+        return SQLAnalysis(sql, error="Multiple SQL statements are not allowed")
+    if not statements:
+        return SQLAnalysis(sql, error="Query must be a single SELECT or WITH statement")
+    tree = statements[0]
+    if not isinstance(tree, exp.Query):
+        return SQLAnalysis(sql, error="Query must be a single SELECT or WITH statement")
+
+    time_dependent = volatile = False
+    for node in tree.walk():
+        if isinstance(node, FORBIDDEN_NODES):
+            return SQLAnalysis(sql, error=f"Only read-only SELECT queries are allowed (found {node.key.upper()})")
+        if isinstance(node, exp.Func):
+            name = (node.name if isinstance(node, exp.Anonymous) else node.sql_name()).lower()
+            if name in FORBIDDEN_FUNCTIONS:
+                return SQLAnalysis(sql, error=f"Function {name} is not allowed")
+            time_dependent = time_dependent or name in TIME_FUNCTIONS
+            volatile = volatile or name in VOLATILE_FUNCTIONS
+
+    cte_names = {cte.alias_or_name for cte in tree.find_all(exp.CTE)}
+    tables: List[str] = []
+    for table in tree.find_all(exp.Table):
+        if not table.name or (not table.db and table.name in cte_names):
+            continue
+        # Unquoted identifiers fold to lower case in Postgres
+        table_name = table.name if table.this.quoted else table.name.lower()
+        name = f"{table.db}.{table_name}" if table.db else table_name
+        if name not in tables:
+            tables.append(name)
+    columns: List[str] = []
+    for column in tree.find_all(exp.Column):
+        name = f"{column.table}.{column.name}" if column.table else column.name
+        if column.name and name not in columns:
+            columns.append(name)
+
+    # Literals become placeholders; identifiers/keywords are canonicalized by the generator
+    normalized_tree = tree.copy().transform(
+        lambda node: exp.Placeholder() if isinstance(node, exp.Literal) else node
+    )
+    normalized = normalized_tree.sql(dialect="postgres", normalize=True)
+    return SQLAnalysis(
+        sql, tables=tables, columns=columns, normalized=normalized, fingerprint=_fingerprint(normalized),
+        canonical=tree.sql(dialect="postgres", normalize=True), time_dependent=time_dependent, volatile=volatile,
+    )
+
+
+def _analyze_tokens(sql: str) -> SQLAnalysis:
+    """Validate Postgres syntax the parser does not cover on its token stream instead."""
+    tokens = Postgres().tokenize(sql)
+    while tokens and tokens[-1].token_type == TokenType.SEMICOLON:
+        tokens.pop()
+    if not tokens or tokens[0].token_type not in (TokenType.SELECT, TokenType.WITH):
+        return SQLAnalysis(sql, error="Query must be a single SELECT or WITH statement", parsed=False)
+    for token in tokens:
+        if token.token_type == TokenType.SEMICOLON:
+            return SQLAnalysis(sql, error="Multiple SQL statements are not allowed", parsed=False)
+        if token.token_type in FORBIDDEN_TOKENS:
+            return SQLAnalysis(sql, error=f"Only read-only SELECT queries are allowed (found {token.text.upper()})", parsed=False)
+        if token.text.lower() in FORBIDDEN_FUNCTIONS:
+            return SQLAnalysis(sql, error=f"Function {token.text.lower()} is not allowed", parsed=False)
+    words = [t.text if t.token_type in (TokenType.IDENTIFIER, TokenType.VAR) else t.text.upper() for t in tokens]
+    normalized = " ".join(
+        "%s" if t.token_type in (TokenType.STRING, TokenType.NUMBER) else word for t, word in zip(tokens, words)
+    )
+    canonical = " ".join(
+        "'" + t.text.replace("'", "''") + "'" if t.token_type == TokenType.STRING
+        else t.text if t.token_type == TokenType.NUMBER else word
+        for t, word in zip(tokens, words)
+    )
+    names = {t.text.lower() for t in tokens}
+    return SQLAnalysis(
+        sql, normalized=normalized, fingerprint=_fingerprint(normalized), canonical=canonical,
+        time_dependent=bool(names & TIME_FUNCTIONS), volatile=bool(names & VOLATILE_FUNCTIONS), parsed=False,
+    )
@@ -1,8 +1,13 @@
 import logging
 import os
+from contextlib import asynccontextmanager
 from .api import endpoints
+from .ai.agent_graph import schema_catalog, schema_versions, warm_agent_graphs
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
+from .core.metrics import render_latest
+from .core.config import SCHEMA_CATALOG_PATH
+from .core.database import replica_router
 
 def _configure_logging() -> None:
     # Default to INFO to avoid noisy third-party DEBUG logs
@@ -27,7 +32,45 @@ def _configure_logging() -> None:
 _configure_logging()
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Ecommerce ERP AI Agent")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Compile every graph variant up front so /ask never pays for graph construction
+    report = warm_agent_graphs()
+    logger.info(f"Agent graphs compiled in {report['total']} ms: {report}")
+    app.state.graph_warmup = report
+    if replica_router.replicas:
+        # First lag check before serving, so replicas take traffic from the first request
+        await replica_router.refresh()
+        logger.info(f"Read replicas: {replica_router.status()}")
+    if schema_versions is not None:
+        # Baseline before the catalog load, so a change made during the load is still seen
+        try:
+            await schema_versions.check()
+        except Exception:
+            logger.exception("Schema version check failed; it will be retried in the background")
+        schema_versions.start()
+    if schema_catalog is not None:
+        try:
+            static = schema_catalog.load_static(SCHEMA_CATALOG_PATH)
+        except Exception:
+            logger.exception(f"Schema catalog {SCHEMA_CATALOG_PATH} could not be read")
+            static = False
+        if static:
+            # The model catalog answers from the first request; the live one replaces it when read
+            schema_catalog.load_in_background()
+        else:
+            # Whole schema in two catalog queries, so requests never introspect tables
+            try:
+                await schema_catalog.load()
+            except Exception:
+                logger.exception("Schema catalog load failed; it will be retried on first use")
+    yield
+    if schema_versions is not None:
+        await schema_versions.stop()
+
+
+app = FastAPI(title="Ecommerce ERP AI Agent", lifespan=lifespan)
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -42,4 +85,10 @@ app.include_router(endpoints.router)
 @app.get("/")
 async def root():
     logger.debug("Root endpoint hit")
-    return {"message": "Welcome to the Ecommerce ERP AI Agent!"}
\ No newline at end of file
+    return {"message": "Welcome to the Ecommerce ERP AI Agent!"}
+
+
+@app.get("/metrics")
+async def metrics_endpoint() -> Response:
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
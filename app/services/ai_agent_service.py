@@ -1,12 +1,112 @@
-from typing import Any, Dict, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
+import asyncio
 import logging
-from app.ai.agent_graph import run_agent_graph
+from app.ai.agent_graph import arun_agent_graph, astream_agent_graph, result_cache, schema_versions, sql_agent
+from app.ai.shared_context import SharedSchemaContext
+from app.core.answer_cache import build_answer_cache
+from app.core.config import (
+    ANSWER_CACHE_BACKEND,
+    ANSWER_CACHE_MAX_ENTRIES,
+    ANSWER_CACHE_PATH,
+    ANSWER_CACHE_TTL_SECONDS,
+    ASK_BATCH_PARALLELISM,
+    RESULT_CACHE_WATERMARK_TTL_SECONDS,
+    SCHEMA_FINGERPRINT_TTL_SECONDS,
+)
+from app.core.metrics import record_cache
+from app.core.result_cache import WatermarkProbe
+from app.core.singleflight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
+def normalize_question(question: str) -> str:
+    return " ".join((question or "").lower().split())
+
+# Concurrent identical /ask requests (e.g. a dashboard refresh storm) share one graph run
+_inflight_questions = SingleFlight()
+
+# Repeated questions are answered from cache until the schema or the ingested data changes
+answer_cache = build_answer_cache(
+    ANSWER_CACHE_BACKEND, ANSWER_CACHE_PATH, ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL_SECONDS, SCHEMA_FINGERPRINT_TTL_SECONDS,
+    # Shared with the result cache: a watermark read for one serves both
+    result_cache.watermarks if result_cache is not None else WatermarkProbe(RESULT_CACHE_WATERMARK_TTL_SECONDS),
+    schema_versions,
+)
+
+async def _cached_answer(question: str, schema_context: str, output_format: str, db_schema: Optional[str], run) -> Dict[str, Any]:
+    if answer_cache is None:
+        return await run()
+    cached, key = await answer_cache.lookup(normalize_question(question), output_format, db_schema, schema_context)
+    if cached is not None:
+        return cached
+    result = await run()
+    await answer_cache.store(key, result)
+    return result
+
 # Single orchestration entry point used by FastAPI
-def answer_business_question(question: str, schema_context: str, output_format: str = "json", db_schema: Optional[str] = None) -> Dict[str, Any]:
+async def answer_business_question(question: str, schema_context: str, output_format: str = "json", db_schema: Optional[str] = None) -> Dict[str, Any]:
     logger.debug(f"/ask received - question: {question}, output_format: {output_format}, db_schema: {db_schema}")
-    result = run_agent_graph(question, schema_context, output_format, db_schema=db_schema)
-    logger.debug(f"/ask result: {result}")
-    return result
\ No newline at end of file
+    key = (normalize_question(question), output_format, db_schema)
+    result, shared = await _inflight_questions.do(
+        key,
+        lambda: _cached_answer(
+            question, schema_context, output_format, db_schema,
+            lambda: arun_agent_graph(question, schema_context, output_format, db_schema=db_schema),
+        ),
+    )
+    record_cache("singleflight", shared)
+    logger.debug(f"/ask result (coalesced={shared}): {result}")
+    return result
+
+# Next page of a truncated SQL answer, used by /results/{token}; runs no LLM call
+async def fetch_result_page(token: str) -> Dict[str, Any]:
+    logger.debug("/results received")
+    return await sql_agent.afetch_page(token)
+
+# Streaming variant used by /ask/stream: yields graph progress events as they happen
+async def stream_business_question(question: str, schema_context: str, output_format: str = "json", db_schema: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+    logger.debug(f"/ask/stream received - question: {question}, output_format: {output_format}, db_schema: {db_schema}")
+    async for event in astream_agent_graph(question, schema_context, output_format, db_schema=db_schema):
+        yield event
+
+# Batch variant used by /ask/batch: identical questions are answered once, retrieval and
+# introspection are shared across the batch, and at most `parallelism` questions run at once
+async def answer_business_questions(
+    questions: List[str],
+    schema_context: str,
+    output_format: str = "json",
+    db_schema: Optional[str] = None,
+    parallelism: Optional[int] = None,
+) -> Dict[str, Any]:
+    limit = max(1, min(parallelism or ASK_BATCH_PARALLELISM, ASK_BATCH_PARALLELISM))
+    unique: Dict[str, str] = {}
+    for q in questions:
+        unique.setdefault(normalize_question(q), q)
+    logger.debug(f"/ask/batch received - {len(questions)} questions ({len(unique)} unique), parallelism: {limit}")
+
+    shared = SharedSchemaContext()
+    semaphore = asyncio.Semaphore(limit)
+
+    async def answer(question: str) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                return await _cached_answer(
+                    question, schema_context, output_format, db_schema,
+                    lambda: arun_agent_graph(question, schema_context, output_format, db_schema=db_schema, shared_context=shared),
+                )
+            except Exception as e:
+                logger.exception("Batch question failed")
+                return {"error": str(e)}
+
+    try:
+        answers = await asyncio.gather(*(answer(q) for q in unique.values()))
+    except asyncio.CancelledError:
+        # Client went away: shared retrievals are shielded from the questions, so stop them here
+        shared.cancel()
+        raise
+    by_key = dict(zip(unique.keys(), answers))
+    return {
+        "results": [{"question": q, **by_key[normalize_question(q)]} for q in questions],
+        "unique_questions": len(unique),
+        "parallelism": limit,
+    }
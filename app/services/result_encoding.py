@@ -0,0 +1,101 @@
+"""Alternative encodings of tabular /ask results.
+
+The default "rows" encoding returns a list of dicts, repeating every column name on
+every row. "columnar" returns {"columns", "types", "data"} with one value array per
+column; "arrow" (IPC stream) and "parquet" return the result as a binary table with
+the rest of the answer payload (sql, watermark, timings, ...) as JSON under the
+"answer" schema metadata key.
+
+Only JSON-format SQL answers have a table to encode; any other payload (calculation
+and fallback answers, errors) is returned unchanged as JSON.
+"""
+import datetime
+import decimal
+import io
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core import fast_json
+
+ENCODINGS = ("rows", "columnar", "arrow", "parquet")
+MEDIA_TYPES = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Checked in order: bool before int, datetime before date (subclasses)
+_VALUE_TYPES = (
+    (bool, "boolean"),
+    (int, "integer"),
+    (float, "float"),
+    (decimal.Decimal, "decimal"),
+    (datetime.datetime, "timestamp"),
+    (datetime.date, "date"),
+    (datetime.time, "time"),
+    (str, "string"),
+)
+
+
+def tabular_rows(payload: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+    """The result rows of a JSON SQL answer, or None when the payload has no table."""
+    if not isinstance(payload, dict) or payload.get("format") != "json" or payload.get("error"):
+        return None
+    rows = payload.get("result")
+    if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+        return None
+    if rows and "error" in rows[0]:
+        return None
+    return rows
+
+
+def _value_type(values: List[Any]) -> str:
+    for value in values:
+        if value is None:
+            continue
+        return next((name for cls, name in _VALUE_TYPES if isinstance(value, cls)), "json")
+    return "null"
+
+
+def to_columnar(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    columns = list(rows[0]) if rows else []
+    data = [[row.get(c) for row in rows] for c in columns]
+    return {"columns": columns, "types": [_value_type(values) for values in data], "data": data}
+
+
+def _arrow_table(rows: List[Dict[str, Any]], metadata: Dict[str, Any]):
+    import pyarrow as pa
+
+    columnar = to_columnar(rows)
+    arrays = []
+    for values in columnar["data"]:
+        try:
+            arrays.append(pa.array(values))
+        except (pa.ArrowException, TypeError, ValueError):
+            # Mixed or unsupported values (e.g. JSON objects): ship the column as text
+            arrays.append(pa.array([None if v is None else fast_json.dumps(v).decode() for v in values]))
+    return pa.Table.from_arrays(
+        arrays, names=columnar["columns"], metadata={"answer": fast_json.dumps(metadata)}
+    )
+
+
+def encode_binary(payload: Dict[str, Any], encoding: str) -> Tuple[bytes, str]:
+    """Encode a tabular payload (see tabular_rows) as Arrow IPC or Parquet; returns (body, media_type)."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    rows = tabular_rows(payload) or []
+    table = _arrow_table(rows, {k: v for k, v in payload.items() if k != "result"})
+    sink = io.BytesIO()
+    if encoding == "parquet":
+        pq.write_table(table, sink)
+    else:
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    return sink.getvalue(), MEDIA_TYPES[encoding]
+
+
+def encode_columnar(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Replace a tabular payload's row list with its columnar form; other payloads pass through."""
+    rows = tabular_rows(payload)
+    if rows is None:
+        return payload
+    return {**payload, "result": to_columnar(rows), "encoding": "columnar"}
@@ -0,0 +1,112 @@
+"""Concurrency benchmark for POST /ask.
+
+Fires rounds of concurrent requests at increasing concurrency levels and reports
+p50/p95/p99 latency and throughput per level, plus the first level at which p99
+degrades past a multiple of the single-request p99 (the "knee").
+
+Two modes:
+- `--url http://host:port` benchmarks a running server end to end.
+- Without `--url` the app is served in-process and the LLM is replaced by a fixed
+  latency stand-in (`--llm-ms`), so the numbers isolate how the serving path
+  handles concurrent waits (threadpool vs event loop) against a real Postgres
+  from DATABASE_URL. Run the same script against two checkouts to compare
+  before/after, e.g. `PYTHONPATH=<checkout> python scripts/bench_ask_concurrency.py`.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Dict, List
+
+import httpx
+
+QUESTION = "Top 20 Sponsored Brands campaigns by spend"
+ROUTE_REPLY = json.dumps({"agent": "business_sql_agent", "index_terms": ["amzn_ads_sb_campaigns", "spend", "campaign"]})
+SQL_REPLY = "SELECT campaign_name, cost FROM amzn_ads_sb_campaigns ORDER BY cost DESC LIMIT 20"
+
+
+def _install_fake_llm(latency_ms: float) -> None:
+    from langchain_core.messages import AIMessage
+    from langchain_openai import ChatOpenAI
+
+    def reply(prompt) -> AIMessage:
+        text = str(prompt)
+        return AIMessage(content=ROUTE_REPLY if "supervisor AI" in text else SQL_REPLY)
+
+    def invoke(self, prompt, *args, **kwargs):
+        time.sleep(latency_ms / 1000)
+        return reply(prompt)
+
+    async def ainvoke(self, prompt, *args, **kwargs):
+        await asyncio.sleep(latency_ms / 1000)
+        return reply(prompt)
+
+    ChatOpenAI.invoke = invoke
+    ChatOpenAI.ainvoke = ainvoke
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[idx]
+
+
+async def _run_level(client: httpx.AsyncClient, concurrency: int, rounds: int) -> Dict[str, float]:
+    latencies: List[float] = []
+    errors = 0
+
+    async def one() -> None:
+        nonlocal errors
+        start = time.perf_counter()
+        resp = await client.post("/ask", json={"question": QUESTION, "output_format": "json"})
+        latencies.append((time.perf_counter() - start) * 1000)
+        if resp.status_code != 200 or "error" in resp.text[:200]:
+            errors += 1
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(*(one() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(statistics.median(latencies), 1),
+        "p95_ms": round(_percentile(latencies, 95), 1),
+        "p99_ms": round(_percentile(latencies, 99), 1),
+        "rps": round(len(latencies) / elapsed, 1),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Benchmark a running server instead of the in-process app")
+    parser.add_argument("--levels", default="1,8,16,32,64,128,256")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--llm-ms", type=float, default=300.0, help="Stand-in LLM latency per call (in-process mode)")
+    parser.add_argument("--knee-factor", type=float, default=2.0)
+    args = parser.parse_args()
+
+    if args.url:
+        transport, base_url = None, args.url
+    else:
+        _install_fake_llm(args.llm_ms)
+        from app.main import app
+        transport, base_url = httpx.ASGITransport(app=app), "http://bench"
+
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=120) as client:
+        await client.post("/ask", json={"question": QUESTION})  # warm up pools and graphs
+        results = []
+        for level in [int(x) for x in args.levels.split(",")]:
+            res = await _run_level(client, level, args.rounds)
+            results.append(res)
+            print(json.dumps(res))
+
+    baseline = results[0]["p99_ms"]
+    knee = next((r["concurrency"] for r in results if r["p99_ms"] > args.knee_factor * baseline), None)
+    print(f"p99 degrades past {args.knee_factor}x single-request p99 ({baseline} ms) at concurrency: {knee or 'not reached'}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
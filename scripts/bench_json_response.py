@@ -0,0 +1,89 @@
+"""Benchmark JSON encoding of a 1000-row settlement result.
+
+Builds rows shaped like amzn_settlement_report_data_v2 results (every column of
+AmznSettlementReportDataV2, with Decimal/date/datetime values as psycopg returns
+them) and times, per encode of the full /ask payload:
+
+- default: FastAPI's path, jsonable_encoder then json.dumps (JSONResponse.render)
+- orjson+hook: app/core/fast_json.dumps on the same rows; Decimal goes through the default hook
+- orjson+loader: fast_json.dumps on rows whose NUMERIC values were already loaded as
+  float or str by psycopg (DECIMAL_ENCODING), which is what /ask serves
+
+Needs no database: `python scripts/bench_json_response.py --rows 1000 --repeat 20`.
+"""
+import argparse
+import datetime
+import decimal
+import random
+import statistics
+import time
+from typing import Any, Callable, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import DECIMAL, Date, DateTime, Integer
+
+from app.core import fast_json
+from app.core.config import DECIMAL_ENCODING
+from app.models.amazon.fba import AmznSettlementReportDataV2
+
+
+def _value(column, i: int) -> Any:
+    if isinstance(column.type, DECIMAL):
+        return decimal.Decimal(random.randint(-100000, 100000)) / 100
+    if isinstance(column.type, DateTime):
+        return datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc) + datetime.timedelta(minutes=i * 7)
+    if isinstance(column.type, Date):
+        return datetime.date(2025, 1, 1) + datetime.timedelta(days=i % 365)
+    if isinstance(column.type, Integer):
+        return i
+    return f"{column.name}-{i % 97}"
+
+
+def settlement_rows(count: int) -> List[Dict[str, Any]]:
+    columns = list(AmznSettlementReportDataV2.__table__.columns)
+    return [{c.name: _value(c, i) for c in columns} for i in range(count)]
+
+
+def loaded(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    convert = str if DECIMAL_ENCODING == "string" else float
+    return [{k: convert(v) if isinstance(v, decimal.Decimal) else v for k, v in row.items()} for row in rows]
+
+
+def payload(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {"format": "json", "result": rows, "sql": "SELECT * FROM amzn_settlement_report_data_v2 LIMIT 1000", "truncated": False}
+
+
+def _time(fn: Callable[[], bytes], repeat: int) -> Dict[str, float]:
+    samples, size = [], 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = len(fn())
+        samples.append((time.perf_counter() - start) * 1000)
+    return {"median_ms": round(statistics.median(samples), 2), "min_ms": round(min(samples), 2), "bytes": size}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    random.seed(0)
+    rows = settlement_rows(args.rows)
+    decimal_payload, loaded_payload = payload(rows), payload(loaded(rows))
+    response = JSONResponse(content=None)
+    results = {
+        "default": _time(lambda: response.render(jsonable_encoder(decimal_payload)), args.repeat),
+        "orjson+hook": _time(lambda: fast_json.dumps(decimal_payload), args.repeat),
+        "orjson+loader": _time(lambda: fast_json.dumps(loaded_payload), args.repeat),
+    }
+    columns = len(rows[0]) if rows else 0
+    print(f"{args.rows} rows x {columns} columns, DECIMAL_ENCODING={DECIMAL_ENCODING}, {args.repeat} runs")
+    baseline = results["default"]["median_ms"]
+    for name, r in results.items():
+        print(f"{name:>14}  median {r['median_ms']:8.2f} ms  min {r['min_ms']:8.2f} ms  {r['bytes']:>9} bytes  x{baseline / r['median_ms']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Build the static schema catalog from the SQLAlchemy models, or check it.
+
+Compiles Base.metadata plus the model docstrings and column group comments
+(app/ai/tools/model_catalog.py) into SCHEMA_CATALOG_PATH (default
+app/ai/schema/catalog.json), which the API loads at startup without a database
+round trip. Re-run it after changing app/models and commit the file.
+
+Run from the repository root with the root on the import path:
+
+- `PYTHONPATH=. python scripts/build_schema_catalog.py` (or
+  `python -m scripts.build_schema_catalog`) writes the catalog
+- `--check` exits 1 when the file on disk is not what the models compile to
+- `--drift` reads the live schema from DATABASE_URL (two pg_catalog queries) and
+  reports tables and columns that differ from the models; exits 1 on drift
+"""
+import argparse
+import asyncio
+import json
+import sys
+from typing import Any, Dict
+
+from app.ai.tools.model_catalog import compile_models, diff_schemas, has_drift
+from app.core.config import SCHEMA_CATALOG_PATH
+from app.models import Base
+
+
+def _render(document: Dict[str, Any]) -> str:
+    # One key per line keeps diffs of the committed file reviewable
+    return json.dumps(document, indent=1, ensure_ascii=False) + "\n"
+
+
+async def _live_tables():
+    from app.ai.tools.schema_catalog import SchemaCatalog
+
+    catalog = SchemaCatalog()
+    await catalog.load()
+    return catalog.entries()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=SCHEMA_CATALOG_PATH)
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--check", action="store_true", help="fail when the catalog file is out of date")
+    mode.add_argument("--drift", action="store_true", help="diff the models against the live database")
+    args = parser.parse_args()
+
+    document = compile_models(Base)
+    if args.drift:
+        report = diff_schemas(document["tables"], asyncio.run(_live_tables()))
+        print(json.dumps(report, indent=2))
+        return 1 if has_drift(report) else 0
+    rendered = _render(document)
+    if args.check:
+        try:
+            with open(args.output, encoding="utf-8") as f:
+                current = f.read()
+        except FileNotFoundError:
+            current = ""
+        if current != rendered:
+            print(f"{args.output} is out of date; run PYTHONPATH=. python scripts/build_schema_catalog.py", file=sys.stderr)
+            return 1
+        print(f"{args.output} is up to date ({document['version']})")
+        return 0
+    with open(args.output, "w", encoding="utf-8") as f:
+        f.write(rendered)
+    columns = sum(len(t["columns"]) for t in document["tables"])
+    print(f"Wrote {args.output}: {len(document['tables'])} tables, {columns} columns, version {document['version']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())